@@ -20,7 +20,7 @@ from core.region_extractor import extract_regions
 from core.text_associator import associate_text_to_regions
 from vision.label_detector import detect_labels
 from qa.sanity_checks import run_sanity_checks
-from qa.confidence_scorer import compute_confidence
+from qa.confidence_scorer import compute_confidences
 
 router = APIRouter()
 
@@ -93,8 +93,7 @@ async def extract_quantities(
             )
             all_labels.extend(labels_result.labels)
         
-        # Map segments to Cleanup format
-        from core.geometry_cleanup import Segment as ClnSegment, Point as ClnPoint
+        # Layer filter, then cleanup
         from core.layer_filter import filter_segments
         
         # Apply Smart Layer Filter (Optimization Phase 9)
@@ -103,18 +102,10 @@ async def extract_quantities(
         filtered_segments = filter_segments(all_segments, force_full_scan=False)
         print(f"[Filter] After: {len(filtered_segments)} segments")
 
-        cleanup_segments = []
-        for s in filtered_segments:
-            cleanup_segments.append(ClnSegment(
-                start=ClnPoint(s.start.x, s.start.y),
-                end=ClnPoint(s.end.x, s.end.y),
-                layer=s.layer,
-                entity_type=s.entity_type
-            ))
-            
-        # Geometry cleanup
+        # Geometry cleanup (reads parser segments directly; its output is
+        # already in cleanup's own Segment type)
         cleaned_segments = cleanup_geometry(
-            cleanup_segments, 
+            filtered_segments, 
             snap_tolerance=snap_tolerance
         )
         
@@ -174,9 +165,9 @@ async def extract_quantities(
         
         # QA checks and confidence scoring
         validated_matches = []
-        for match in matches:
-            sanity_result = run_sanity_checks(match)
-            confidence = compute_confidence(match, sanity_result)
+        sanity_results = [run_sanity_checks(match) for match in matches]
+        confidences = compute_confidences(matches, sanity_results).tolist()
+        for match, sanity_result, confidence in zip(matches, sanity_results, confidences):
             match.confidence = confidence
             # match.warnings = sanity_result.warnings # Core match might not have warnings field, simpler to map later
             validated_matches.append((match, sanity_result.warnings))
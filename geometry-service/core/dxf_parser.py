@@ -10,6 +10,7 @@ from typing import List, Tuple, Optional
 from dataclasses import dataclass
 import math
 import logging
+import numpy as np
 from core.block_analyzer import analyze_blocks
 from core.semantic_classifier import classify_regions
 from core.spatial_text_matcher import associate_texts
@@ -313,8 +314,23 @@ def extract_text(entity) -> Optional[TextBlock]:
     return None
 
 
-def explode_block(insert: Insert, doc, depth: int = 0, max_depth: int = 10) -> Tuple[List[Segment], List[TextBlock]]:
-    """Recursively explode block references with depth limit"""
+def _insert_matrix(insert: Insert) -> np.ndarray:
+    """INSERT placement (base point, scale, rotation, position) as a 4x4 row-vector matrix"""
+    return np.array(list(insert.matrix44().rows()), dtype=np.float64)
+
+
+def explode_block(
+    insert: Insert, doc, depth: int = 0, max_depth: int = 10,
+    parent: Optional[np.ndarray] = None
+) -> Tuple[List[Segment], List[TextBlock]]:
+    """
+    Recursively explode block references with depth limit.
+    
+    Each level's placement is one affine matrix composed with its parent's
+    (parent: world matrix of the enclosing INSERT), so nested blocks land
+    in world coordinates. The block's own segment endpoints and text
+    positions are transformed together in a single matrix product.
+    """
     segments = []
     texts = []
     
@@ -322,42 +338,47 @@ def explode_block(insert: Insert, doc, depth: int = 0, max_depth: int = 10) -> T
         logger.warning(f"Max recursion depth ({max_depth}) reached for block {insert.dxf.name}")
         return segments, texts
     
+    # Points of this block's own entities, still in block coordinates
+    local_points = []
+    
     try:
         block = doc.blocks.get(insert.dxf.name)
         if not block:
             return segments, texts
         
-        # Get transformation matrix
-        # TODO: Apply proper transformation (rotation, scale, position)
-        offset_x = insert.dxf.insert.x
-        offset_y = insert.dxf.insert.y
-        scale_x = insert.dxf.xscale
-        scale_y = insert.dxf.yscale
+        # Block coordinates -> world: this INSERT's placement, then the parent's
+        matrix = _insert_matrix(insert)
+        if parent is not None:
+            matrix = matrix @ parent
         
         for entity in block:
             if isinstance(entity, Insert):
-                # Recursive block explosion
-                sub_segs, sub_texts = explode_block(entity, doc, depth + 1, max_depth)
+                # Recursive block explosion (returned in world coordinates)
+                sub_segs, sub_texts = explode_block(entity, doc, depth + 1, max_depth, matrix)
                 segments.extend(sub_segs)
                 texts.extend(sub_texts)
             elif isinstance(entity, (Line, LWPolyline, Polyline, Arc, Circle)):
                 entity_segs = extract_line_segments(entity)
-                # Apply block transformation
                 for seg in entity_segs:
-                    seg.start.x = seg.start.x * scale_x + offset_x
-                    seg.start.y = seg.start.y * scale_y + offset_y
-                    seg.end.x = seg.end.x * scale_x + offset_x
-                    seg.end.y = seg.end.y * scale_y + offset_y
+                    local_points.append(seg.start)
+                    local_points.append(seg.end)
                 segments.extend(entity_segs)
             elif isinstance(entity, (Text, MText)):
                 text = extract_text(entity)
                 if text:
-                    text.position.x = text.position.x * scale_x + offset_x
-                    text.position.y = text.position.y * scale_y + offset_y
+                    local_points.append(text.position)
                     texts.append(text)
     except Exception as e:
         logger.error(f"Failed to explode block {insert.dxf.name}: {e}")
     
+    # Apply block transformation to every local point at once
+    if local_points:
+        xy = np.array([(p.x, p.y) for p in local_points], dtype=np.float64)
+        world = (xy @ matrix[:2, :2] + matrix[3, :2]).tolist()
+        for p, (x, y) in zip(local_points, world):
+            p.x = x
+            p.y = y
+    
     return segments, texts
 
 
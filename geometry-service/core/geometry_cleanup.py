@@ -55,11 +55,13 @@ def snap_vertices(segments: List[Segment], tolerance: float = 0.01) -> List[Segm
     Uses spatial clustering to efficiently find nearby points.
     
     Args:
-        segments: List of line segments
+        segments: List of line segments; only .start/.end coordinates,
+            .layer and .entity_type are read, so parser segments
+            (dxf_parser.Segment) can be passed without converting them
         tolerance: Distance threshold for snapping (default 1cm)
     
     Returns:
-        Segments with snapped vertices
+        Segments with snapped vertices (this module's Segment/Point)
     """
     if not segments:
         return segments
@@ -95,7 +97,9 @@ def snap_vertices(segments: List[Segment], tolerance: float = 0.01) -> List[Segm
             for dy in [-1, 0, 1]:
                 neighbor_cell = (cell[0] + dx, cell[1] + dy)
                 for j in grid[neighbor_cell]:
-                    if pt.distance_to(all_points[j]) <= tolerance:
+                    # Point.distance_to, inlined so any x/y point works
+                    other = all_points[j]
+                    if math.sqrt((pt.x - other.x)**2 + (pt.y - other.y)**2) <= tolerance:
                         nearby_indices.append(j)
         
         # Merge into cluster
@@ -5,12 +5,15 @@ Extracts closed regions (polygons) from line segments using graph theory.
 This is the core algorithm that enables measuring areas from fragmented geometry.
 """
 import networkx as nx
+import numpy as np
+import shapely
 from shapely.geometry import Polygon, LineString, Point as ShapelyPoint
 from shapely.ops import polygonize, unary_union, nearest_points
 from shapely.strtree import STRtree
 from shapely.geometry import MultiPoint
 from typing import List, Tuple, Optional, Set
 from dataclasses import dataclass, field
+from functools import cached_property
 import math
 from collections import defaultdict
 import uuid
@@ -50,13 +53,21 @@ class Region:
     
     def contains_point(self, point: Point) -> bool:
         """Check if a point is inside this region"""
-        sp = ShapelyPoint(point.x, point.y)
-        return self.shapely_polygon.contains(sp)
+        return bool(shapely.contains_xy(self.shapely_polygon, point.x, point.y))
+    
+    def contains_points(self, xs, ys) -> np.ndarray:
+        """Vectorized contains_point: boolean array for coordinate arrays xs, ys"""
+        return shapely.contains_xy(self.shapely_polygon, xs, ys)
     
     def distance_to_point(self, point: Point) -> float:
         """Get distance from point to nearest boundary"""
         sp = ShapelyPoint(point.x, point.y)
         return self.shapely_polygon.exterior.distance(sp)
+    
+    @cached_property
+    def convex_hull_area(self) -> float:
+        """Area of the convex hull (computed once per region)"""
+        return self.shapely_polygon.convex_hull.area
 
 
 def segments_to_linestrings(segments: List[Segment]) -> List[LineString]:
@@ -456,8 +467,8 @@ def score_region(
     # Factor 3: Geometric regularity (20% weight)
     # Prefer rectangular-ish shapes (common in architecture)
     try:
-        convex_hull = region.shapely_polygon.convex_hull
-        convexity = region.area / convex_hull.area if convex_hull.area > 0 else 0
+        hull_area = region.convex_hull_area
+        convexity = region.area / hull_area if hull_area > 0 else 0
         score += convexity * 0.2
     except:
         pass
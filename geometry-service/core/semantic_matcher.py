@@ -8,10 +8,20 @@ import requests
 import json
 from typing import List, Optional, Tuple, Any
 from difflib import SequenceMatcher
+from functools import lru_cache
 import re
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# RapidFuzz (C++) for fuzzy scoring; difflib fallback if not installed
+try:
+    from rapidfuzz import fuzz, process
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+    logger.warning("rapidfuzz not available, falling back to difflib for fuzzy matching")
+
 # Hardcoded Construction Synonyms (Level 1 Intelligence)
 SYNONYMS = {
     "muro": ["tabique", "murete", "wall", "pantalla", "hormigon"],
@@ -24,16 +34,21 @@ SYNONYMS = {
     "ceramica": ["porcelanato", "baldoza", "tile"],
 }
 
+_NON_WORD = re.compile(r'[^\w\s]')
+
+@lru_cache(maxsize=65536)
+def _normalize(text: str) -> str:
+    # Labels are compared against every Excel item; normalize each string once
+    if not text: return ""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
 class SemanticMatcher:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.use_llm = bool(self.api_key)
         
     def normalize(self, text: str) -> str:
-        if not text: return ""
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', ' ', text)
-        return text.strip()
+        return _normalize(text)
 
     def get_synonyms(self, term: str) -> List[str]:
         term = self.normalize(term)
@@ -43,43 +58,105 @@ class SemanticMatcher:
         return []
 
     def fuzzy_score(self, t1: str, t2: str) -> float:
+        if HAS_RAPIDFUZZ:
+            return fuzz.ratio(t1, t2) / 100.0
         return SequenceMatcher(None, t1, t2).ratio()
 
-    def match(self, target: str, candidates: List[str], threshold: float = 0.5) -> List[Tuple[str, float, str]]:
+    def match(
+        self,
+        target: str,
+        candidates: List[str],
+        threshold: float = 0.5,
+        candidate_norms: Optional[List[str]] = None
+    ) -> List[Tuple[str, float, str]]:
         """
         Match target text against a list of candidates.
+        candidate_norms: normalized candidates, if the caller already has them
         Returns list of (candidate, score, strategy)
         """
-        results = []
-        target_norm = self.normalize(target)
-        target_synonyms = self.get_synonyms(target_norm)
+        return self.match_many([target], candidates, threshold, candidate_norms, workers=1)[0]
+
+    def match_many(
+        self,
+        targets: List[str],
+        candidates: List[str],
+        threshold: float = 0.5,
+        candidate_norms: Optional[List[str]] = None,
+        workers: int = -1
+    ) -> List[List[Tuple[str, float, str]]]:
+        """
+        match() for many targets against the same candidates. Fuzzy scores for
+        the whole targets x candidates matrix come from a single cdist call.
+        Returns one (candidate, score, strategy) list per target.
+        """
+        target_norms = [self.normalize(t) for t in targets]
+        cand_norms = candidate_norms if candidate_norms is not None else [self.normalize(c) for c in candidates]
         
-        for cand in candidates:
-            cand_norm = self.normalize(cand)
-            
-            # 1. Exact Match
-            if target_norm == cand_norm:
-                results.append((cand, 1.0, "exact"))
-                continue
-                
-            # 2. Synonym Match
-            is_synonym = False
-            for syn in target_synonyms:
-                if syn in cand_norm:
-                    results.append((cand, 0.95, "synonym"))
-                    is_synonym = True
-                    break
-            if is_synonym:
-                continue
+        # Candidate positions by normalized text, for exact matches
+        norm_index = {}
+        for i, cn in enumerate(cand_norms):
+            norm_index.setdefault(cn, []).append(i)
+        
+        # Fuzzy scores for all pairs in one C++ call
+        fuzzy_matrix = None
+        if HAS_RAPIDFUZZ and target_norms and cand_norms:
+            fuzzy_matrix = process.cdist(
+                target_norms, cand_norms, scorer=fuzz.ratio,
+                score_cutoff=threshold * 100, dtype=np.float64, workers=workers
+            ) / 100.0
+        
+        return [
+            self._rank(
+                target_norm, candidates, cand_norms, norm_index, threshold,
+                fuzzy_matrix[k] if fuzzy_matrix is not None else None
+            )
+            for k, target_norm in enumerate(target_norms)
+        ]
 
-            # 3. Fuzzy Match
-            score = self.fuzzy_score(target_norm, cand_norm)
-            if score >= threshold:
-                results.append((cand, score, "fuzzy"))
+    def _rank(
+        self,
+        target_norm: str,
+        candidates: List[str],
+        cand_norms: List[str],
+        norm_index: dict,
+        threshold: float,
+        fuzzy_scores: Optional[np.ndarray]
+    ) -> List[Tuple[str, float, str]]:
+        """Score one normalized target: exact > synonym > fuzzy, best first"""
+        target_synonyms = self.get_synonyms(target_norm)
+        scored = {}  # candidate index -> (score, strategy)
+        
+        # 1. Exact Match
+        for i in norm_index.get(target_norm, ()):
+            scored[i] = (1.0, "exact")
+        
+        # 2. Synonym Match
+        if target_synonyms:
+            for i, cand_norm in enumerate(cand_norms):
+                if i not in scored and any(syn in cand_norm for syn in target_synonyms):
+                    scored[i] = (0.95, "synonym")
+        
+        # 3. Fuzzy Match
+        if fuzzy_scores is not None:
+            for i in np.flatnonzero(fuzzy_scores >= threshold):
+                i = int(i)
+                if i not in scored:
+                    scored[i] = (float(fuzzy_scores[i]), "fuzzy")
+        else:
+            for i, cand_norm in enumerate(cand_norms):
+                if i in scored:
+                    continue
+                # ratio <= 2*min(len)/(len1+len2): skip pairs that can't reach threshold
+                l1, l2 = len(target_norm), len(cand_norm)
+                if 2 * min(l1, l2) < threshold * (l1 + l2):
+                    continue
+                score = self.fuzzy_score(target_norm, cand_norm)
+                if score >= threshold:
+                    scored[i] = (score, "fuzzy")
         
-        # Sort by score
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
+        # Sort by score (ties keep candidate order)
+        order = sorted(scored, key=lambda i: (-scored[i][0], i))
+        return [(candidates[i], scored[i][0], scored[i][1]) for i in order]
 
     def ask_llm_match(self, target: str, candidates: List[str]) -> Optional[Tuple[str, float]]:
         """
@@ -3,11 +3,13 @@
 Spatial Index Module
 Links textual labels (Room Names) to geometric zones (Floor Polygons) using R-Tree.
 """
-from typing import List, Optional, Tuple, Dict
+from typing import Any, List, Optional, Tuple, Dict
 from dataclasses import dataclass
 from shapely.strtree import STRtree
 from shapely.geometry import Polygon, Point as ShapelyPoint
 from fitz import Point  # Helper, though we mostly use Shapely
+import numpy as np
+import shapely
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,26 +24,33 @@ class Zone:
     confidence: float  # Validation confidence
 
 class SpatialIndex:
-    def __init__(self, polygons: List[Tuple[Polygon, str, str]]):
+    def __init__(self, polygons: List[Tuple[Polygon, str, Any]], node_capacity: int = 10):
         """
         Args:
-            polygons: List of (ShapelyPolygon, layer_name, entity_handle)
+            polygons: List of (ShapelyPolygon, layer_name, entity_handle).
+                The handle is returned as-is by the lookups, so callers may
+                pass the owning object itself (e.g. a Region).
+            node_capacity: STRtree fan-out (max geometries per node). The
+                tree is STR bulk-loaded; 10 suits point/box queries.
         """
         self.polygons = []
-        self.polygons = []
         self.metadata = {}  # index -> (layer, handle)
-        self.geom_map = {}  # id(geom) -> (layer, handle)
         
         valid_polys = []
         for i, (poly, layer, handle) in enumerate(polygons):
             if poly.is_valid and not poly.is_empty:
-                valid_polys.append(poly)
                 valid_polys.append(poly)
                 self.metadata[len(valid_polys)-1] = (layer, handle)
-                self.geom_map[id(poly)] = (layer, handle)
         
-        self.tree = STRtree(valid_polys) if valid_polys else None
+        self.tree = STRtree(valid_polys, node_capacity=node_capacity) if valid_polys else None
         self.geometries = valid_polys
+        # Prepared polygons: point-in-polygon tests reuse cached edge indexes
+        self._geom_array = np.array(valid_polys, dtype=object)
+        shapely.prepare(self._geom_array)
+        # Axis-aligned rectangles (common for rooms/hatches) need only a bbox
+        # comparison; everything else goes through prepared contains
+        self._bounds = shapely.bounds(self._geom_array).reshape(-1, 4)
+        self._is_box = shapely.equals(self._geom_array, shapely.envelope(self._geom_array))
         logger.info(f"SpatialIndex built with {len(valid_polys)} polygons.")
 
     def find_zone(self, point_x: float, point_y: float) -> Optional[Dict]:
@@ -85,6 +94,65 @@ class SpatialIndex:
             "polygon": best["polygon"]
         }
 
+    def find_zones_batch(self, points: np.ndarray) -> List[Optional[Any]]:
+        """
+        Vectorized find_zone over an array of Shapely points: handle of the
+        smallest polygon containing each point, or None. One tree query.
+        """
+        n = len(points)
+        handles = [None] * n
+        if not self.tree or n == 0:
+            return handles
+        
+        # (point, polygon) bbox candidates, then strict containment tested
+        # against the prepared polygons
+        pt_idx, geom_idx = self.tree.query(points)
+        inside = np.empty(len(pt_idx), dtype=bool)
+        
+        # Envelope-first: strict interior of the bbox for rectangles
+        is_box = self._is_box[geom_idx]
+        b = self._bounds[geom_idx[is_box]]
+        x, y = shapely.get_x(points[pt_idx[is_box]]), shapely.get_y(points[pt_idx[is_box]])
+        inside[is_box] = (b[:, 0] < x) & (x < b[:, 2]) & (b[:, 1] < y) & (y < b[:, 3])
+        
+        rest = ~is_box
+        inside[rest] = shapely.contains(self._geom_array[geom_idx[rest]], points[pt_idx[rest]])
+        pt_idx, geom_idx = pt_idx[inside], geom_idx[inside]
+        if len(pt_idx) == 0:
+            return handles
+        
+        # Smallest containing zone per point: sort by (point, area), keep the first
+        areas = shapely.area(self._geom_array[geom_idx])
+        order = np.lexsort((areas, pt_idx))
+        pt_idx, geom_idx = pt_idx[order], geom_idx[order]
+        first = np.ones(len(pt_idx), dtype=bool)
+        first[1:] = pt_idx[1:] != pt_idx[:-1]
+        
+        for p, g in zip(pt_idx[first], geom_idx[first]):
+            handles[p] = self.metadata[g][1]
+        return handles
+
+    def find_nearest_zones_batch(
+        self, points: np.ndarray, max_distance: float = 5.0
+    ) -> Tuple[List[Optional[Any]], np.ndarray]:
+        """
+        Vectorized find_nearest_zone: (handles, distances) per point, with
+        None / inf where no polygon lies within max_distance.
+        """
+        n = len(points)
+        handles = [None] * n
+        distances = np.full(n, np.inf)
+        if not self.tree or n == 0:
+            return handles, distances
+        
+        (pt_idx, geom_idx), dists = self.tree.query_nearest(
+            points, max_distance=max_distance, return_distance=True, all_matches=False
+        )
+        for p, g, d in zip(pt_idx, geom_idx, dists):
+            handles[p] = self.metadata[g][1]
+            distances[p] = d
+        return handles, distances
+
     def find_nearest_zone(self, point_x: float, point_y: float, max_distance: float = 5.0) -> Optional[Dict]:
         """
         Find the nearest polygon within max_distance.
@@ -95,53 +163,23 @@ class SpatialIndex:
             
         pt = ShapelyPoint(point_x, point_y)
         
-        # 1. Use nearest neighbor search
-        # Note: behavior depends on shapely version. 
-        # For robustness, we can query a buffer if we're unsure, but nearest is standard.
-        try:
-            nearest_geom = self.tree.nearest(pt)
-        except Exception:
-            # Fallback for older shapely or empty tree
-            return None
-            
-        if not nearest_geom:
-            return None
-            
-        # 2. Check distance
-        dist = nearest_geom.distance(pt)
-        if dist > max_distance:
-            return None
-            
-        # 3. Find metadata for this geometry
-        meta = self.geom_map.get(id(nearest_geom))
-        if not meta:
+        # 1. Nearest neighbor search bounded by max_distance.
+        # Shapely 2 returns tree indices, which key straight into self.metadata.
+        idxs, dists = self.tree.query_nearest(
+            pt, max_distance=max_distance, return_distance=True, all_matches=False
+        )
+        if len(idxs) == 0:
             return None
-            
-        layer, handle = meta
+        
+        idx = int(idxs[0])
+        geom = self.geometries[idx]
+        layer, handle = self.metadata[idx]
         
         return {
             "name": "Unknown",
             "layer": layer,
-            "handle": handle, # Include handle
-            "area": nearest_geom.area,
-            "polygon": nearest_geom
+            "handle": handle,
+            "area": geom.area,
+            "polygon": geom,
+            "distance": float(dists[0])
         }
-        
-        # Optimization: Re-use self.metadata which is index -> ...
-        # But nearest() returns geom. 
-        # Let's search by equality (geometry object identity)
-        
-        match = None
-        for idx, geom in enumerate(self.geometries):
-             if geom is nearest_geom: # identity check should work if tree holds refs
-                 layer, handle = self.metadata[idx]
-                 match = {
-                     "polygon": geom,
-                     "layer": layer,
-                     "handle": handle,
-                     "area": geom.area,
-                     "distance": dist
-                 }
-                 break
-        
-        return match
@@ -7,37 +7,44 @@ Used by semantic classifier to improve classification accuracy.
 Key features:
 - Proximity-based text-to-region association
 - Relevance scoring by distance
-- Spatial indexing for performance (optional Rtree)
+- Spatial indexing for performance (STRtree)
 """
 
 import logging
+from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
-from shapely.geometry import Polygon, Point, box
+from shapely.geometry import Polygon, Point, LineString, box
+from shapely.strtree import STRtree
+import shapely
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
-# Try to import Rtree for spatial indexing (optional dependency)
-try:
-    from rtree import index
-    HAS_RTREE = True
-except ImportError:
-    HAS_RTREE = False
-    logger.warning("Rtree not available, falling back to brute-force spatial search")
+
+@dataclass(frozen=True, slots=True)
+class _TextPoints:
+    """Text dicts of one associate call, with their positions as x/y arrays and points"""
+    texts: List[Dict]
+    xs: np.ndarray
+    ys: np.ndarray
+    pts: np.ndarray
 
 
 class SpatialTextMatcher:
     """Associates text labels with geometric regions using spatial proximity"""
     
-    def __init__(self, max_distance: float = 5.0, use_spatial_index: bool = True):
+    def __init__(
+        self,
+        max_distance: float = 5.0,
+        use_spatial_index: bool = True
+    ):
         """
         Args:
             max_distance: Maximum distance (in DXF units, typically meters) to associate text
-            use_spatial_index: Use Rtree spatial index if available (faster for large datasets)
+            use_spatial_index: Use spatial indexes to prefilter text candidates (faster for large datasets)
         """
         self.max_distance = max_distance
-        self.use_spatial_index = use_spatial_index and HAS_RTREE
-        self.idx = None
+        self.use_spatial_index = use_spatial_index
     
     def associate_texts_to_regions(
         self,
@@ -53,39 +60,65 @@ class SpatialTextMatcher:
         
         Returns:
             regions with added 'associated_texts' field containing relevant text labels
+            (the region dicts are updated in place)
         """
         if not texts:
             logger.debug("No texts provided, skipping text association")
-            return [{**r, 'associated_texts': []} for r in regions]
+            for r in regions:
+                r['associated_texts'] = []
+            return regions
         
-        # Build spatial index if requested
-        if self.use_spatial_index:
-            self._build_spatial_index(regions)
+        # Build text points once; every region is tested against this array.
+        # Per-call state stays in locals so one matcher can serve concurrent calls
+        valid_texts = [t for t in texts if t.get('position') and len(t['position']) >= 2]
+        n = len(valid_texts)
+        xs = np.fromiter((t['position'][0] for t in valid_texts), dtype=np.float64, count=n)
+        ys = np.fromiter((t['position'][1] for t in valid_texts), dtype=np.float64, count=n)
+        text_points = _TextPoints(valid_texts, xs, ys, shapely.points(xs, ys))
         
-        results = []
+        # Polygon geometry per region (by position), built once and shared
+        # by the candidate search and the main loop
+        poly_cache = [self._cache_polygon(r) for r in regions]
         
-        for region in regions:
-            polygon = self._get_polygon(region)
-            if not polygon or not polygon.is_valid:
-                logger.warning(f"Invalid polygon for region {region.get('id', 'unknown')}, skipping")
-                results.append({**region, 'associated_texts': []})
-                continue
-            
-            # Find texts near this region
-            associated = self._find_texts_for_region(polygon, texts, region.get('id'))
-            
-            results.append({
-                **region,
-                'associated_texts': associated
-            })
+        # Prefilter candidate texts per region if requested
+        if self.use_spatial_index:
+            candidates = self._find_candidate_pairs(text_points, poly_cache)
+        else:
+            candidates = [None] * len(regions)
+        
+        results = [
+            self._process_region(r, c, cand, text_points)
+            for r, c, cand in zip(regions, poly_cache, candidates)
+        ]
         
+        total = 0
+        for r in results:
+            total += len(r['associated_texts'])
+        avg = total / len(results) if results else 0
         logger.info(
             f"Associated texts to {len(results)} regions. "
-            f"Avg texts per region: {np.mean([len(r['associated_texts']) for r in results]):.1f}"
+            f"Avg texts per region: {avg:.1f}"
         )
         
         return results
     
+    def _process_region(
+        self,
+        region: Dict,
+        cached: Optional[Tuple],
+        cand: Optional[np.ndarray],
+        text_points: _TextPoints
+    ) -> Dict:
+        """Associate texts to a single region"""
+        if not cached or not cached[0].is_valid:
+            logger.warning(f"Invalid polygon for region {region.get('id', 'unknown')}, skipping")
+            region['associated_texts'] = []
+            return region
+        
+        # Find texts near this region
+        region['associated_texts'] = self._find_texts_for_region(text_points, cached, region.get('id'), cand)
+        return region
+    
     def _get_polygon(self, region: Dict) -> Optional[Polygon]:
         """Extract Shapely Polygon from region dict"""
         # Check if already a polygon
@@ -112,79 +145,129 @@ class SpatialTextMatcher:
         
         return None
     
-    def _build_spatial_index(self, regions: List[Dict]):
-        """Build R-tree spatial index for regions"""
-        if not HAS_RTREE:
-            return
+    def _cache_polygon(
+        self,
+        region: Dict
+    ) -> Optional[Tuple[Polygon, Point, LineString, Tuple[float, float, float, float]]]:
+        """Build (polygon, centroid, exterior, bounds) for a region, or None"""
+        polygon = self._get_polygon(region)
+        if not polygon:
+            return None
+        exterior = polygon.exterior
+        # Prepared geometries amortize the PiP/distance setup across all texts
+        shapely.prepare(polygon)
+        shapely.prepare(exterior)
+        return (polygon, polygon.centroid, exterior, polygon.bounds)
+    
+    def _find_candidate_pairs(
+        self,
+        text_points: _TextPoints,
+        poly_cache: List[Optional[Tuple]]
+    ) -> List[np.ndarray]:
+        """
+        Candidate text indices per region, from two batched STRtree queries
+        (texts → regions) instead of one scan per region.
         
-        self.idx = index.Index()
+        A text can qualify by being inside / near the boundary (covered by
+        dwithin the polygon) or near the centroid, which for concave shapes
+        may lie outside the polygon, so centroids get their own tree.
+        """
+        n_regions = len(poly_cache)
+        valid = np.array([i for i, c in enumerate(poly_cache) if c], dtype=np.intp)
+        if len(valid) == 0 or len(text_points.pts) == 0:
+            return [np.empty(0, dtype=np.intp) for _ in range(n_regions)]
+        
+        d = self.max_distance
+        polygons = STRtree([poly_cache[i][0] for i in valid])
+        centroids = STRtree([poly_cache[i][1] for i in valid])
+        t1, r1 = polygons.query(text_points.pts, predicate='dwithin', distance=d)
+        t2, r2 = centroids.query(text_points.pts, predicate='dwithin', distance=d)
         
-        for i, region in enumerate(regions):
-            polygon = self._get_polygon(region)
-            if polygon:
-                bounds = polygon.bounds  # (minx, miny, maxx, maxy)
-                self.idx.insert(i, bounds)
+        # Unique (region, text) pairs grouped by region
+        region_idx = valid[np.concatenate([r1, r2])]
+        text_idx = np.concatenate([t1, t2])
+        order = np.lexsort((text_idx, region_idx))
+        region_idx, text_idx = region_idx[order], text_idx[order]
+        unique = np.ones(len(order), dtype=bool)
+        unique[1:] = (region_idx[1:] != region_idx[:-1]) | (text_idx[1:] != text_idx[:-1])
+        region_idx, text_idx = region_idx[unique], text_idx[unique]
         
-        logger.debug(f"Built spatial index with {len(regions)} regions")
+        bounds = np.searchsorted(region_idx, np.arange(n_regions + 1))
+        return [text_idx[bounds[i]:bounds[i + 1]] for i in range(n_regions)]
     
     def _find_texts_for_region(
         self,
-        polygon: Polygon,
-        all_texts: List[Dict],
-        region_id: str = None
+        text_points: _TextPoints,
+        cached: Tuple[Polygon, Point, LineString, Tuple[float, float, float, float]],
+        region_id: str = None,
+        cand: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """Find all texts within max_distance of a region"""
-        centroid = polygon.centroid
-        centroid_point = Point(centroid.x, centroid.y)
+        polygon, centroid_point, exterior, bounds = cached
         
-        associated_texts = []
+        # Candidate texts (from _find_candidate_pairs), or all of them
+        if cand is None:
+            cand = np.arange(len(text_points.xs))
+        pts = text_points.pts[cand]
         
-        for text in all_texts:
-            # Get text position
-            pos = text.get('position')
-            if not pos or len(pos) < 2:
-                continue
-            
-            text_point = Point(pos[0], pos[1])
-            
-            # Calculate distance (three methods, in order of priority)
-            
-            # 1. Check if text is INSIDE region (distance = 0)
-            if polygon.contains(text_point):
-                distance = 0.0
+        
+        # Calculate distance (three methods, in order of priority), one C loop each
+        
+        # 1. Check if text is INSIDE region (distance = 0)
+        inside = shapely.contains_xy(polygon, text_points.xs[cand], text_points.ys[cand])
+        
+        # 2. Check distance to centroid (threshold only; GEOS stops early)
+        near_centroid = ~inside
+        near_centroid[near_centroid] = shapely.dwithin(
+            centroid_point, pts[near_centroid], self.max_distance
+        )
+        
+        # 3. Check distance to boundary (only for texts not resolved above)
+        near_boundary = ~inside & ~near_centroid
+        near_boundary[near_boundary] = shapely.dwithin(
+            exterior, pts[near_boundary], self.max_distance
+        )
+        
+        # True distances only for the survivors
+        distance = np.zeros(len(cand))
+        distance[near_centroid] = shapely.distance(centroid_point, pts[near_centroid])
+        distance[near_boundary] = shapely.distance(exterior, pts[near_boundary])
+        
+        keep = np.flatnonzero(inside | near_centroid | near_boundary)
+        
+        # Calculate relevance score (1.0 = inside, decreases with distance),
+        # rounded as returned
+        relevance = np.round(1.0 / (1.0 + distance[keep]), 3)
+        
+        # Limit to top 10 most relevant texts, ties in text order (what a
+        # stable sort by relevance gives): keep everything tied with the
+        # 10th value, then order by (-relevance, candidate index)
+        if len(keep) > 10:
+            sel = np.flatnonzero(relevance >= -np.partition(-relevance, 9)[9])
+            keep, relevance = keep[sel], relevance[sel]
+        order = np.lexsort((keep, -relevance))[:10]
+        keep, relevance = keep[order], relevance[order]
+        
+        # Round only the rows that are returned
+        d_out = np.round(distance[keep], 2).tolist()
+        r_out = relevance.tolist()
+        
+        associated_texts = []
+        for k, i in enumerate(keep):
+            if inside[i]:
                 relationship = 'inside'
-            
-            # 2. Check distance to centroid
-            elif centroid_point.distance(text_point) <= self.max_distance:
-                distance = centroid_point.distance(text_point)
+            elif near_centroid[i]:
                 relationship = 'near_centroid'
-            
-            # 3. Check distance to boundary
             else:
-                distance = polygon.exterior.distance(text_point)
-                if distance > self.max_distance:
-                    continue  # Too far
                 relationship = 'near_boundary'
             
-            # Calculate relevance score (1.0 = inside, decreases with distance)
-            if distance == 0:
-                relevance = 1.0
-            else:
-                relevance = 1.0 / (1.0 + distance)
-            
             associated_texts.append({
-                'content': text.get('content', '').strip(),
-                'distance': round(distance, 2),
-                'relevance': round(relevance, 3),
+                'content': text_points.texts[cand[i]].get('content', '').strip(),
+                'distance': d_out[k],
+                'relevance': r_out[k],
                 'relationship': relationship
             })
         
-        # Sort by relevance (highest first)
-        associated_texts.sort(key=lambda x: x['relevance'], reverse=True)
-        
-        # Limit to top 10 most relevant texts
-        associated_texts = associated_texts[:10]
-        
         if associated_texts:
             logger.debug(
                 f"Region {region_id or 'unknown'}: Found {len(associated_texts)} texts, "
@@ -6,8 +6,10 @@ Uses fuzzy matching and Spatial Indexing to associate partidas with geometry.
 from typing import List, Optional, Tuple, Dict, Any
 from dataclasses import dataclass
 from difflib import SequenceMatcher
+from functools import lru_cache
 import re
 import logging
+import numpy as np
 
 from core.spatial_index import SpatialIndex
 # Import Region/Point type hits only for static analysis if needed, 
@@ -19,10 +21,25 @@ from core.semantic_matcher import SemanticMatcher
 # Singleton instance
 matcher = SemanticMatcher()
 
+import shapely
 from shapely.geometry import box, LineString
 from shapely.strtree import STRtree
 from shapely.geometry import Point as ShapelyPoint
 
+@dataclass(slots=True)
+class VirtualRegion:
+    """Duck-typed stand-in for region_extractor.Region, built by the fallback estimator"""
+    id: str
+    area: float
+    perimeter: float
+    layer: str
+    shapely_polygon: Any
+
+    @property
+    def convex_hull_area(self) -> float:
+        """Same as region_extractor.Region.convex_hull_area (uncached: slots)"""
+        return self.shapely_polygon.convex_hull.area
+
 def estimate_unclosed_area(
     center: Any, 
     segment_tree: Optional[STRtree], 
@@ -46,42 +63,33 @@ def estimate_unclosed_area(
                      
     # Query tree
     try:
-        candidates = segment_tree.query(search_box)
-        # Handle index vs geom return (depending on shapely ver)
-        # We assume segment_map maps id(geom) -> segment OR we just trust candidates are LineStrings
-        
-        relevant_geoms = []
-        if hasattr(candidates, 'dtype') and candidates.dtype != 'object':
-            # Indices path
-            # We need the list of geoms used to build the tree.
-            # Passed via closure or hack? STRtree keeps geometries usually.
-            relevant_geoms = [segment_tree.geometries.take(i) for i in candidates]
-        else:
-            relevant_geoms = candidates
-            
-        if not relevant_geoms:
+        # Shapely 2 returns tree indices; anything within search_radius of
+        # the center intersects the search box, so filter on that in C
+        candidates = segment_tree.query(search_box, predicate='intersects')
+        if len(candidates) == 0:
             return None
-            
-        # Calculate bounds of candidates
-        min_x, min_y = float('inf'), float('inf')
-        max_x, max_y = float('-inf'), float('-inf')
-        count = 0
+        relevant_geoms = segment_tree.geometries[candidates]
         
-        for geom in relevant_geoms:
-            # Check simple distance to center (improve accuracy vs box)
-            if geom.distance(p) > search_radius:
-                continue
-                
-            b = geom.bounds
-            min_x = min(min_x, b[0])
-            min_y = min(min_y, b[1])
-            max_x = max(max_x, b[2])
-            max_y = max(max_y, b[3])
-            count += 1
+        # Distance from the center to each candidate's bbox is a lower bound
+        # on the true distance: cheap NumPy pass first, exact GEOS distance
+        # only for the survivors
+        bounds = shapely.bounds(relevant_geoms)
+        dx = np.maximum(0.0, np.maximum(bounds[:, 0] - center.x, center.x - bounds[:, 2]))
+        dy = np.maximum(0.0, np.maximum(bounds[:, 1] - center.y, center.y - bounds[:, 3]))
+        near = np.hypot(dx, dy) <= search_radius
+        
+        # Check simple distance to center (improve accuracy vs box)
+        near[near] = shapely.distance(relevant_geoms[near], p) <= search_radius
+        count = int(near.sum())
             
         if count < 3: # Need at least 3 walls to guess a room
             return None
             
+        # Calculate bounds of candidates
+        bounds = bounds[near]
+        min_x, min_y = bounds[:, :2].min(axis=0).tolist()
+        max_x, max_y = bounds[:, 2:].max(axis=0).tolist()
+        
         width = max(0, max_x - min_x)
         height = max(0, max_y - min_y)
         area = width * height
@@ -90,16 +98,13 @@ def estimate_unclosed_area(
             return None
             
         # Create virtual region
-        # Duck-typed object
-        class VirtualRegion:
-            pass
-        vr = VirtualRegion()
-        vr.id = "estimated_fallback"
-        vr.area = area
-        vr.perimeter = (width + height) * 2
-        vr.layer = "Fallback Estimation"
-        vr.shapely_polygon = box(min_x, min_y, max_x, max_y)
-        return vr
+        return VirtualRegion(
+            id="estimated_fallback",
+            area=area,
+            perimeter=(width + height) * 2,
+            layer="Fallback Estimation",
+            shapely_polygon=box(min_x, min_y, max_x, max_y)
+        )
         
     except Exception:
         pass
@@ -130,13 +135,33 @@ class Match:
     confidence: float
     match_reason: str
 
+# Items measured on horizontal surfaces (m2 from plan area, not wall height)
+_HORIZONTAL_RE = re.compile(r'cielo|pisos|pavimento|losa|radier|sobrelosa|vitrina')
+
+# Unit spellings, lowercased
+_UNITS_AREA = frozenset({'m2', 'm²', 'metro cuadrado'})
+_UNITS_LINEAR = frozenset({'ml', 'm', 'metro lineal'})
+_UNITS_COUNT = frozenset({'un', 'u', 'unidad', 'c/u', 'num', 'gl'})
+
+_PUNCT = re.compile(r'[^\w\s]')
+
+class _PunctTable(dict):
+    """str.translate table mapping every non-word, non-space char to ' '.
+    Filled lazily so accented letters and non-ASCII symbols follow the same
+    rule as _PUNCT without scanning the string with the regex engine."""
+    def __missing__(self, code: int) -> str:
+        c = chr(code)
+        value = ' ' if _PUNCT.match(c) else c
+        self[code] = value
+        return value
+
+_PUNCT_TABLE = _PunctTable()
+
+@lru_cache(maxsize=65536)
 def normalize_text(text: str) -> str:
     """Normalize text for comparison"""
     if not text: return ""
-    text = text.lower()
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return " ".join(text.lower().translate(_PUNCT_TABLE).split())
 
 def fuzzy_match_score(text1: str, text2: str) -> float:
     """Calculate fuzzy match score between two texts"""
@@ -166,10 +191,30 @@ def fuzzy_match_score(text1: str, text2: str) -> float:
     
     return ratio
 
+def _position_xy(position: Any) -> Tuple[float, float]:
+    """(x, y) of a label position, or NaNs if it has none"""
+    x = getattr(position, 'x', None)
+    y = getattr(position, 'y', None)
+    if x is None or y is None:
+        return (np.nan, np.nan)
+    return (x, y)
+
+def build_label_map(labels: List[Label]) -> Dict[str, List[Label]]:
+    """Group labels by text (duplicates exist), preserving first-seen order"""
+    label_map = {}
+    for l in labels:
+        if l.text not in label_map:
+            label_map[l.text] = []
+        label_map[l.text].append(l)
+    return label_map
+
 def find_matching_labels(
     item: ExcelItem,
     labels: List[Label],
-    threshold: float = 0.5
+    threshold: float = 0.5,
+    label_map: Optional[Dict[str, List[Label]]] = None,
+    candidate_texts: Optional[List[str]] = None,
+    candidate_norms: Optional[List[str]] = None
 ) -> List[Tuple[Label, float]]:
     excel_description_norm = normalize_text(item.description)
     if not excel_description_norm: 
@@ -183,30 +228,40 @@ def find_matching_labels(
     # Optimization: Filter labels first by simple containment or length?
     # Or just passthrough.
     
-    candidate_texts = [l.text for l in labels if l.text]
+    # Map back to Label objects
+    # Creating a map text->[Label] (since duplicates exist); callers matching
+    # many items pass it, and the candidate texts, in prebuilt
+    if label_map is None:
+        label_map = build_label_map(labels)
+    
+    # Each distinct text is scored once
+    if candidate_texts is None:
+        candidate_texts = [t for t in label_map if t]
+        candidate_norms = None
     
     # Use SemanticMatcher
     # returns [(text, score, strategy)]
-    results = matcher.match(item.description, candidate_texts, threshold=threshold)
-    
-    # Map back to Label objects
-    # Creating a map text->[Label] (since duplicates exist)
-    label_map = {}
-    for l in labels:
-        if l.text not in label_map:
-            label_map[l.text] = []
-        label_map[l.text].append(l)
-        
+    results = matcher.match(
+        item.description, candidate_texts, threshold=threshold, candidate_norms=candidate_norms
+    )
+    return labels_from_matches(results, label_map)
+
+def labels_from_matches(
+    results: List[Tuple[str, float, str]],
+    label_map: Dict[str, List[Label]]
+) -> List[Tuple[Label, float]]:
+    """Expand SemanticMatcher (text, score, strategy) results to (Label, score)"""
     label_matches = []
-    seen_labels = set()
+    # label_map groups are disjoint, so a label can only repeat through a
+    # repeated text: dedup per text instead of hashing every label
+    seen_texts = set()
     
     for text, score, strategy in results:
+        if text in seen_texts:
+            continue
+        seen_texts.add(text)
         # Get all labels with this text
-        lbls = label_map.get(text, [])
-        for lbl in lbls:
-            if id(lbl) not in seen_labels:
-                label_matches.append((lbl, score))
-                seen_labels.add(id(lbl))
+        label_matches.extend((lbl, score) for lbl in label_map.get(text, ()))
                 
     return label_matches
 
@@ -219,11 +274,13 @@ def associate_text_to_regions(
 
     spatial_search_radius: float = 2.0,
     segments: List[Any] = None, # NEW: For Fallback Estimator
-    default_height: float = 2.4 # NEW: Fallback height for Linear Area items
+    default_height: float = 2.4, # NEW: Fallback height for Linear Area items
+    node_capacity: int = 10 # STRtree fan-out for the region and segment trees
 ) -> List[Match]:
     """
     Main function to associate Excel items with regions via text labels.
     Now uses SPATIAL INDEX for robust containment checks.
+    node_capacity can be raised for drawings with very many regions/segments.
     """
     matches = []
     
@@ -234,104 +291,172 @@ def associate_text_to_regions(
     for r in regions:
         # region_extractor.Region has .shapely_polygon
         if hasattr(r, 'shapely_polygon'):
-            poly_list.append((r.shapely_polygon, r.layer, r.id))
+            # The region itself is the handle, so lookups return it directly
+            poly_list.append((r.shapely_polygon, r.layer, r))
     
-    spatial_index = SpatialIndex(poly_list)
+    spatial_index = SpatialIndex(poly_list, node_capacity=node_capacity)
     
-    # Create lookup map for O(1) access
-    region_id_map = {r.id: r for r in regions}
+    # Segment tree for the Fallback Estimator, bulk-loaded once
+    segment_tree = None
+    if segments:
+        seg_geoms = [LineString([(s.start.x, s.start.y), (s.end.x, s.end.y)]) 
+                    for s in segments if hasattr(s, 'start')]
+        if seg_geoms:
+            segment_tree = STRtree(seg_geoms, node_capacity=node_capacity)
+    
+    # Label texts grouped and normalized once for all items
+    label_map = build_label_map(labels)
+    candidate_texts = [t for t in label_map if t]
+    candidate_norms = [matcher.normalize(t) for t in candidate_texts]
+    
+    # Label positions as one contiguous (N, 2) array; label_pts is the
+    # geometry array every spatial query below runs on. Labels without a
+    # position get NaN and are kept out of the spatial lookups (has_position)
+    label_index = {id(l): i for i, l in enumerate(labels)}
+    label_xy = np.ascontiguousarray(
+        [_position_xy(l.position) for l in labels], dtype=np.float64
+    ).reshape(-1, 2)
+    has_position = ~np.isnan(label_xy).any(axis=1)
+    label_pts = shapely.points(label_xy[:, 0], label_xy[:, 1])
+    
+    # Skip titles/summary once, up front
+    items_work = [it for it in excel_items if it.description and len(it.description) >= 3]
+    
+    # Step 1 for every item at once: a single items x label-texts fuzzy
+    # score matrix instead of one scoring pass per item. Items that
+    # normalize to nothing (e.g. '---') have no candidates.
+    scorable = [k for k, it in enumerate(items_work) if normalize_text(it.description)]
+    item_results = [[] for _ in items_work]
+    for k, results in zip(scorable, matcher.match_many(
+        [items_work[k].description for k in scorable], candidate_texts,
+        threshold=text_match_threshold, candidate_norms=candidate_norms
+    )):
+        item_results[k] = results
+    
+    # Only labels that some item matched (and that have a position) need a
+    # spatial lookup
+    matched = np.array(sorted({
+        label_index[id(l)]
+        for results in item_results
+        for text, _, _ in results
+        for l in label_map[text]
+    }), dtype=np.intp)
+    matched = matched[has_position[matched]]
+    
+    # Containing zone and nearest zone of every matched label, one batched
+    # query each. The nearest zone within the larger radius is also the
+    # nearest within the proximity radius, so one query serves both checks.
+    proximity_radius = 0.5
+    label_zones = [None] * len(labels)
+    label_nearest = [None] * len(labels)
+    label_nearest_dist = np.full(len(labels), np.inf)
+    if len(matched):
+        zones = spatial_index.find_zones_batch(label_pts[matched])
+        for k, li in enumerate(matched):
+            label_zones[li] = zones[k]
+        
+        # Nearest-zone fallback only for labels outside every zone
+        missing = matched[np.array([z is None for z in zones], dtype=bool)]
+        if len(missing):
+            nearest, nearest_dist = spatial_index.find_nearest_zones_batch(
+                label_pts[missing], max_distance=max(proximity_radius, spatial_search_radius)
+            )
+            for k, li in enumerate(missing):
+                label_nearest[li] = nearest[k]
+            label_nearest_dist[missing] = nearest_dist
 
-    for item in excel_items:
-        # Skip titles/summary
-        if not item.get('description') or len(item.get('description')) < 3:
-            continue
-            
+    # Step 2a: resolve each matched label to a region once. The result only
+    # depends on the label, so items sharing a label reuse it.
+    label_region = [None] * len(labels)
+    label_strategy = [None] * len(labels)
+    label_spatial = np.zeros(len(labels))
+    label_resolved = np.zeros(len(labels), dtype=bool)
+    for li in matched:
+        label = labels[li]
+        region_match = None
+        strategy = "none"
+        spatial_score = 0.0
+        
+        # Spatial Query using Index (Zone Match)
+        if label_zones[li] is not None:
+            region_match = label_zones[li]
+            strategy = "inside_zone"
+            spatial_score = 1.0 
+
+        # Proximity Check
+        if not region_match and label_nearest_dist[li] <= proximity_radius:
+            region_match = label_nearest[li]
+            strategy = "proximity"
+            spatial_score = 0.8
+        
+        # Fallback Estimator
+        if not region_match and segment_tree:
+            fallback_region = estimate_unclosed_area(
+                label.position, 
+                segment_tree, 
+                {},
+                search_radius=5.0
+            )
+            if fallback_region:
+                region_match = fallback_region
+                strategy = "fallback_estimator"
+                spatial_score = 1.0 # High confidence if geometry found
+
+        # Nearest Neighbor Fallback
+        if not region_match and label_nearest_dist[li] <= spatial_search_radius:
+            region_match = label_nearest[li]
+            strategy = "nearest_neighbor"
+            dist = float(label_nearest_dist[li])
+            spatial_score = max(0.5, 1.0 - (dist / spatial_search_radius))
+        
+        if region_match:
+            label_region[li] = region_match
+            label_strategy[li] = strategy
+            label_spatial[li] = spatial_score
+            label_resolved[li] = True
+
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+    for item, results in zip(items_work, item_results):
         # Step 1: Find matching labels (Text Match)
-        matching_labels = find_matching_labels(item, labels, threshold=text_match_threshold)
+        matching_labels = labels_from_matches(results, label_map)
         
-        best_match = None
-        best_score = 0.0
+        desc_low = item.description.lower()
         
         # DEBUG TRACE for problematic items
-        debug_item = "sobrelosa" in item.description.lower()
+        debug_item = debug_enabled and "sobrelosa" in desc_low
         if debug_item:
-            print(f"[TextAssociator] Tracing '{item.description}' (ID: {item.id})")
-            print(f"  - Found {len(matching_labels)} text candidate labels")
+            logger.debug(f"[TextAssociator] Tracing '{item.description}' (ID: {item.id})")
+            logger.debug(f"  - Found {len(matching_labels)} text candidate labels")
             for l, s in matching_labels[:5]:
-                print(f"    * '{l.text}' (Score: {s:.2f}) at {l.position}")
+                logger.debug(f"    * '{l.text}' (Score: {s:.2f}) at {l.position}")
 
         # Step 2: Aggregate ALL valid matches (1-to-Many)
         valid_matches = []
         matched_region_ids = set()
         
-        for label, text_score in matching_labels:
-            # Spatial Query using Index (Zone Match)
-            zone = spatial_index.find_zone(label.position.x, label.position.y)
-            
-            region_match = None
-            strategy = "none"
-            spatial_score = 0.0
-            
-            if zone:
-                region_match = region_id_map.get(zone.get('handle'))
-                if region_match:
-                    strategy = "inside_zone"
-                    spatial_score = 1.0 
-
-            # Proximity Check
-            if not region_match:
-                nearby_zone = spatial_index.find_nearest_zone(label.position.x, label.position.y, max_distance=0.5)
-                if nearby_zone:
-                     region_match = region_id_map.get(nearby_zone.get('handle'))
-                     if region_match:
-                        strategy = "proximity"
-                        spatial_score = 0.8
+        if matching_labels:
+            # Spatial side was resolved once per label; combine with the
+            # text scores for all candidates at once
+            idx = np.fromiter(
+                (label_index[id(l)] for l, _ in matching_labels), dtype=np.intp, count=len(matching_labels)
+            )
+            text_scores = np.fromiter(
+                (ts for _, ts in matching_labels), dtype=np.float64, count=len(matching_labels)
+            )
+            combined = text_scores * 0.6 + label_spatial[idx] * 0.4
             
-            # Fallback Estimator
-            if not region_match and segments:
-                if 'segment_tree' not in locals():
-                    seg_geoms = [LineString([(s.start.x, s.start.y), (s.end.x, s.end.y)]) 
-                                for s in segments if hasattr(s, 'start')]
-                    if seg_geoms:
-                        segment_tree = STRtree(seg_geoms)
-                    else:
-                        segment_tree = None
-                
-                if segment_tree:
-                    fallback_region = estimate_unclosed_area(
-                        label.position, 
-                        segment_tree, 
-                        {},
-                        search_radius=5.0
+            # Check confidence threshold (e.g. 0.6)
+            for k in np.flatnonzero(label_resolved[idx] & (combined >= 0.6)):
+                li = idx[k]
+                region_match = label_region[li]
+                # Avoid double counting the same region for the same item
+                # (e.g. two labels "Sala" in the same room)
+                if region_match.id not in matched_region_ids:
+                    matched_region_ids.add(region_match.id)
+                    valid_matches.append(
+                        (region_match, labels[li], label_strategy[li], float(combined[k]))
                     )
-                    if fallback_region:
-                        region_match = fallback_region
-                        strategy = "fallback_estimator"
-                        spatial_score = 1.0 # High confidence if geometry found
-
-            # Nearest Neighbor Fallback
-            if not region_match:
-                nearest_zone = spatial_index.find_nearest_zone(
-                    label.position.x, label.position.y, max_distance=spatial_search_radius
-                )
-                if nearest_zone:
-                    region_match = region_id_map.get(nearest_zone.get('handle'))
-                    if region_match:
-                        strategy = "nearest_neighbor"
-                        dist = nearest_zone.get("distance", 0)
-                        spatial_score = max(0.5, 1.0 - (dist / spatial_search_radius)) 
-            
-            if region_match:
-                # Combined Score
-                combined = text_score * 0.6 + spatial_score * 0.4
-                
-                # Check confidence threshold (e.g. 0.6)
-                if combined >= 0.6:
-                    # Avoid double counting the same region for the same item
-                    # (e.g. two labels "Sala" in the same room)
-                    if region_match.id not in matched_region_ids:
-                        matched_region_ids.add(region_match.id)
-                        valid_matches.append((region_match, label, strategy, combined))
 
         # Step 3: Sum Quantities
         if valid_matches:
@@ -344,7 +469,8 @@ def associate_text_to_regions(
             primary_label = best_single_match[1]
             primary_region = best_single_match[0]
             
-            detected_height = default_height # Reset for this item
+            is_horizontal = bool(_HORIZONTAL_RE.search(desc_low))
+            unit = item.unit.lower() if item.unit else ""
             
             # Determine Height Once (Optimization)
             # ... (Reuse height logic if needed, but applied to each region if distinct?)
@@ -358,26 +484,20 @@ def associate_text_to_regions(
                  # Or use item-global detection? Let's use item-global default for now 
                  # or simple logic:
                  
-                 if item.unit and item.unit.lower() in ['m2', 'm²', 'metro cuadrado']:
+                 if unit in _UNITS_AREA:
                      if sub_qty < 0.01 and region.perimeter > 0:
                          # Linear element (Wall) -> Area
-                         # Check keywords for Horizontal
-                         desc = item.description.lower()
-                         horizontal_keywords = ['cielo', 'pisos', 'pavimento', 'losa', 'radier', 'sobrelosa', 'vitrina']
-                         is_horizontal = any(k in desc for k in horizontal_keywords)
-                         
+                         # Horizontal items (keywords checked once per item above)
                          if is_horizontal:
                              if hasattr(region, 'shapely_polygon'):
-                                 sub_qty = region.shapely_polygon.convex_hull.area
+                                 sub_qty = region.convex_hull_area
                          else:
                              sub_qty = region.perimeter * default_height # Use default for speed in agg
                  
-                 elif item.unit:
-                    u = item.unit.lower()
-                    if u in ['ml', 'm', 'metro lineal']:
-                        sub_qty = region.perimeter
-                    elif u in ['un', 'u', 'unidad', 'c/u', 'num', 'gl']:
-                        sub_qty = 1.0
+                 elif unit in _UNITS_LINEAR:
+                    sub_qty = region.perimeter
+                 elif unit in _UNITS_COUNT:
+                    sub_qty = 1.0
                  
                  total_qty += sub_qty
                  match_details.append(f"{lbl.text}({strat})")
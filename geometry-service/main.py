@@ -18,13 +18,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS for Next.js frontend
+# CORS for Next.js frontend: explicit lists instead of "*" wildcards
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:9002", "http://localhost:3000"],
+    allow_origins=("http://localhost:9002", "http://localhost:3000"),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=("GET", "POST", "OPTIONS"),
+    allow_headers=("Content-Type", "Authorization", "X-Requested-With"),
 )
 
 # Include API routes
@@ -3,9 +3,13 @@ Confidence Scorer Module
 
 Computes final confidence scores for matches based on multiple factors.
 """
-from typing import Optional
+from typing import Optional, Sequence
 from dataclasses import dataclass
 
+import numpy as np
+
+from qa.sanity_checks import SeverityLevel
+
 
 @dataclass
 class ConfidenceFactors:
@@ -52,8 +56,11 @@ def compute_geometry_quality_factor(region) -> float:
     # Check convexity (architectural rooms tend to be convex-ish)
     try:
         if hasattr(region, 'shapely_polygon'):
-            hull = region.shapely_polygon.convex_hull
-            convexity = region.area / hull.area if hull.area > 0 else 0
+            # Regions cache their hull area; estimated regions don't
+            hull_area = getattr(region, 'convex_hull_area', None)
+            if hull_area is None:
+                hull_area = region.shapely_polygon.convex_hull.area
+            convexity = region.area / hull_area if hull_area > 0 else 0
             score += convexity * 0.3
         else:
             score += 0.1  # No polygon info
@@ -92,6 +99,41 @@ def compute_expected_match_factor(
         return 0.1  # Very different
 
 
+# Factor order for the batched kernel: text, spatial, geometry, expected, source
+_WEIGHTS = (0.20, 0.25, 0.20, 0.25, 0.10)
+
+
+def _fill_factors(match, factors: ConfidenceFactors) -> ConfidenceFactors:
+    """Derive the factors not provided from the match itself"""
+    if factors.text_match == 0 and hasattr(match, 'confidence'):
+        factors.text_match = match.confidence
+    
+    if factors.geometry_quality == 0 and hasattr(match, 'region'):
+        factors.geometry_quality = compute_geometry_quality_factor(match.region)
+    
+    if factors.expected_match == 0:
+        calculated = getattr(match, 'qty_calculated', 0)
+        expected = getattr(match, 'expected_qty', None)
+        if expected is None and hasattr(match, 'excel_item'):
+            expected = getattr(match.excel_item, 'expected_qty', None)
+        factors.expected_match = compute_expected_match_factor(calculated, expected)
+    
+    return factors
+
+
+def _sanity_multiplier(sanity_result) -> float:
+    """Score multiplier for sanity failures (0.5) and warnings (-10% each)"""
+    if sanity_result and not sanity_result.passed:
+        return 0.5
+    if sanity_result and sanity_result.issues:
+        # Partial penalty for warnings
+        # Enum members are singletons: identity check, no list built
+        warning_count = sum(1 for i in sanity_result.issues if i.severity is SeverityLevel.WARNING)
+        if warning_count > 0:
+            return 1 - warning_count * 0.1
+    return 1.0
+
+
 def compute_confidence(
     match,
     sanity_result = None,
@@ -109,22 +151,7 @@ def compute_confidence(
     
     Sanity failures apply a penalty.
     """
-    if factors is None:
-        factors = ConfidenceFactors()
-    
-    # Extract values from match if not provided
-    if factors.text_match == 0 and hasattr(match, 'confidence'):
-        factors.text_match = match.confidence
-    
-    if factors.geometry_quality == 0 and hasattr(match, 'region'):
-        factors.geometry_quality = compute_geometry_quality_factor(match.region)
-    
-    if factors.expected_match == 0:
-        calculated = getattr(match, 'qty_calculated', 0)
-        expected = getattr(match, 'expected_qty', None)
-        if expected is None and hasattr(match, 'excel_item'):
-            expected = getattr(match.excel_item, 'expected_qty', None)
-        factors.expected_match = compute_expected_match_factor(calculated, expected)
+    factors = _fill_factors(match, factors if factors is not None else ConfidenceFactors())
     
     # Weighted combination
     score = (
@@ -136,17 +163,39 @@ def compute_confidence(
     )
     
     # Sanity penalty
-    if sanity_result and not sanity_result.passed:
-        score *= 0.5
-    elif sanity_result and sanity_result.issues:
-        # Partial penalty for warnings
-        warning_count = len([i for i in sanity_result.issues if i.severity.value == "warning"])
-        if warning_count > 0:
-            score *= (1 - warning_count * 0.1)
+    score *= _sanity_multiplier(sanity_result)
     
     return round(max(0, min(1, score)), 3)
 
 
+def compute_confidences(matches: Sequence, sanity_results: Optional[Sequence] = None) -> np.ndarray:
+    """
+    Batched compute_confidence: one weighted sum and penalty pass over all
+    matches instead of one per match. Returns a float array aligned with
+    matches, same values as calling compute_confidence on each.
+    """
+    if sanity_results is None:
+        sanity_results = [None] * len(matches)
+    
+    F = np.empty((len(matches), len(_WEIGHTS)))
+    for k, match in enumerate(matches):
+        f = _fill_factors(match, ConfidenceFactors())
+        F[k] = (f.text_match, f.spatial_match, f.geometry_quality,
+                f.expected_match, f.source_reliability)
+    
+    # Summed term by term, in the scalar order, so results match exactly
+    scores = F[:, 0] * _WEIGHTS[0]
+    for j in range(1, len(_WEIGHTS)):
+        scores += F[:, j] * _WEIGHTS[j]
+    
+    scores *= np.fromiter(
+        (_sanity_multiplier(r) for r in sanity_results), dtype=np.float64, count=len(matches)
+    )
+    # Python round (correctly rounded) rather than np.round, which scales by
+    # 10**3 first and can land on the other side of a .xxx5 tie
+    return np.array([round(x, 3) for x in np.clip(scores, 0, 1).tolist()])
+
+
 def confidence_to_label(confidence: float) -> str:
     """Convert confidence score to human-readable label"""
     if confidence >= 0.8:
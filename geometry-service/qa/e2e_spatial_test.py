@@ -40,9 +40,6 @@ def run_e2e_test():
     ]
 
     # 2. Prepare Multipart Request
-    files = {
-        'dxf_file': ('test.dxf', open(DXF_PATH, 'rb'), 'application/dxf'),
-    }
     data = {
         'excel_data': json.dumps(excel_payload),
         'use_vision_ai': 'false', # Speed up test
@@ -50,7 +47,12 @@ def run_e2e_test():
     }
 
     try:
-        response = requests.post(API_URL, files=files, data=data, timeout=120)
+        # The DXF handle is closed as soon as the upload is sent
+        with open(DXF_PATH, 'rb') as dxf_fh:
+            files = {
+                'dxf_file': ('test.dxf', dxf_fh, 'application/dxf'),
+            }
+            response = requests.post(API_URL, files=files, data=data, timeout=120)
         
         if response.status_code != 200:
             print(f"❌ API Error: {response.text}")
@@ -0,0 +1,51 @@
+"""
+Opt-in pickle cache for slow steps in the manual pipeline scripts.
+
+Off unless GEOMETRY_CACHE is set. Entries are keyed by the input file
+(path, mtime, size), the step name and parameters, and a hash of the core/
+sources - editing the parser or cleanup code invalidates the cached output
+instead of replaying it.
+"""
+import glob
+import hashlib
+import os
+import pickle
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(SERVICE_DIR, ".cache")
+
+
+def _source_digest() -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for source in sorted(glob.glob(os.path.join(SERVICE_DIR, "core", "*.py"))):
+        with open(source, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load_or_compute(path: str, step: str, compute, **params):
+    """
+    Result of compute() for the file at path, reused from .cache/ when
+    GEOMETRY_CACHE is set and neither the file, params nor core/ changed.
+    """
+    if not os.getenv("GEOMETRY_CACHE"):
+        return compute()
+
+    st = os.stat(path)
+    key = repr((os.path.abspath(path), st.st_mtime_ns, st.st_size, step,
+                sorted(params.items()), _source_digest()))
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+    cache_file = os.path.join(CACHE_DIR, f"{step}-{digest}.pkl")
+
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+
+    result = compute()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write-then-rename so a concurrent run never reads a partial pickle
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    return result
@@ -3,7 +3,7 @@ Sanity Checks Module
 
 Validates extracted quantities against expected ranges and logical constraints.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -51,32 +51,49 @@ TYPICAL_RANGES = {
 }
 
 
+# Same table flattened to (min, max, typical_min, typical_max) tuples:
+# one lookup and an unpack per check instead of four dict reads
+_RANGES = {
+    u: (r["min"], r["max"], r["typical_min"], r["typical_max"])
+    for u, r in TYPICAL_RANGES.items()
+}
+_DEFAULT_RANGE = _RANGES["m2"]
+
+
 def get_range_for_unit(unit: str) -> Dict[str, float]:
     """Get the expected range for a given unit"""
     unit_lower = unit.lower().strip()
     return TYPICAL_RANGES.get(unit_lower, TYPICAL_RANGES["m2"])
 
 
+def _unit_range(unit: str) -> Tuple[float, float, float, float]:
+    """get_range_for_unit as a (min, max, typical_min, typical_max) tuple"""
+    return _RANGES.get(unit.lower().strip(), _DEFAULT_RANGE)
+
+
 def check_absolute_range(quantity: float, unit: str) -> Optional[SanityIssue]:
     """Check if quantity is within absolute acceptable range"""
-    ranges = get_range_for_unit(unit)
-    
-    if quantity < ranges["min"]:
+    mn, mx, _, _ = _unit_range(unit)
+    return _check_absolute(quantity, mn, mx)
+
+
+def _check_absolute(quantity: float, mn: float, mx: float) -> Optional[SanityIssue]:
+    if quantity < mn:
         return SanityIssue(
             rule="absolute_min",
-            message=f"Quantity {quantity:.2f} is below minimum ({ranges['min']})",
+            message=f"Quantity {quantity:.2f} is below minimum ({mn})",
             severity=SeverityLevel.ERROR,
             value=quantity,
-            threshold=ranges["min"]
+            threshold=mn
         )
     
-    if quantity > ranges["max"]:
+    if quantity > mx:
         return SanityIssue(
             rule="absolute_max",
-            message=f"Quantity {quantity:.2f} exceeds maximum ({ranges['max']})",
+            message=f"Quantity {quantity:.2f} exceeds maximum ({mx})",
             severity=SeverityLevel.ERROR,
             value=quantity,
-            threshold=ranges["max"]
+            threshold=mx
         )
     
     return None
@@ -84,24 +101,27 @@ def check_absolute_range(quantity: float, unit: str) -> Optional[SanityIssue]:
 
 def check_typical_range(quantity: float, unit: str) -> Optional[SanityIssue]:
     """Check if quantity is within typical (expected) range"""
-    ranges = get_range_for_unit(unit)
-    
-    if quantity < ranges["typical_min"]:
+    _, _, tmn, tmx = _unit_range(unit)
+    return _check_typical(quantity, tmn, tmx)
+
+
+def _check_typical(quantity: float, tmn: float, tmx: float) -> Optional[SanityIssue]:
+    if quantity < tmn:
         return SanityIssue(
             rule="typical_min",
-            message=f"Quantity {quantity:.2f} is unusually low (typical > {ranges['typical_min']})",
+            message=f"Quantity {quantity:.2f} is unusually low (typical > {tmn})",
             severity=SeverityLevel.WARNING,
             value=quantity,
-            threshold=ranges["typical_min"]
+            threshold=tmn
         )
     
-    if quantity > ranges["typical_max"]:
+    if quantity > tmx:
         return SanityIssue(
             rule="typical_max",
-            message=f"Quantity {quantity:.2f} is unusually high (typical < {ranges['typical_max']})",
+            message=f"Quantity {quantity:.2f} is unusually high (typical < {tmx})",
             severity=SeverityLevel.WARNING,
             value=quantity,
-            threshold=ranges["typical_max"]
+            threshold=tmx
         )
     
     return None
@@ -181,6 +201,34 @@ def check_region_vs_parent(
     return None
 
 
+def _eval(
+    quantity: float,
+    mn: float,
+    mx: float,
+    tmn: float,
+    tmx: float,
+    expected: Optional[float] = None,
+    drawing_area: Optional[float] = None,
+    source_type: str = "unknown",
+    parent_area: Optional[float] = None
+) -> List[SanityIssue]:
+    """
+    Every check on one quantity, with the unit range already unpacked.
+    Each check owns its guard (missing expected/area/parent -> no issue).
+    """
+    issues = []
+    for issue in (
+        _check_absolute(quantity, mn, mx),
+        _check_typical(quantity, tmn, tmx),
+        check_expected_match(quantity, expected),
+        check_hatch_false_positive(quantity, drawing_area, source_type),
+        check_region_vs_parent(quantity, parent_area),
+    ):
+        if issue:
+            issues.append(issue)
+    return issues
+
+
 @dataclass
 class MatchContext:
     """Context information for sanity checking"""
@@ -203,8 +251,6 @@ def run_sanity_checks(match, context: Optional[MatchContext] = None) -> SanityRe
     Returns:
         SanityResult with pass/fail and list of issues
     """
-    issues = []
-    
     # Extract values
     quantity = getattr(match, 'qty_calculated', 0)
     unit = getattr(match, 'unit', 'm2')
@@ -214,35 +260,20 @@ def run_sanity_checks(match, context: Optional[MatchContext] = None) -> SanityRe
         expected = context.expected_qty
         drawing_area = context.drawing_area
         source_type = context.source_type
+        parent_area = context.parent_area
     else:
         expected = getattr(match, 'expected_qty', None)
         drawing_area = None
         source_type = "unknown"
+        parent_area = None
     
-    # Run checks
-    check1 = check_absolute_range(quantity, unit)
-    if check1:
-        issues.append(check1)
-    
-    check2 = check_typical_range(quantity, unit)
-    if check2:
-        issues.append(check2)
-    
-    check3 = check_expected_match(quantity, expected)
-    if check3:
-        issues.append(check3)
-    
-    if context:
-        check4 = check_hatch_false_positive(quantity, drawing_area, source_type)
-        if check4:
-            issues.append(check4)
-        
-        check5 = check_region_vs_parent(quantity, context.parent_area)
-        if check5:
-            issues.append(check5)
+    issues = _eval(
+        quantity, *_unit_range(unit),
+        expected, drawing_area, source_type, parent_area
+    )
     
     # Determine overall pass/fail
-    has_errors = any(i.severity == SeverityLevel.ERROR for i in issues)
+    has_errors = any(i.severity is SeverityLevel.ERROR for i in issues)
     
     return SanityResult(
         passed=not has_errors,
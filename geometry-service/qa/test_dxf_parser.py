@@ -0,0 +1,61 @@
+import math
+import unittest
+
+import ezdxf
+
+from core.dxf_parser import explode_block
+
+
+def place(point, base, scale, rotation, insert):
+    """Block coordinates -> parent coordinates, written out by hand:
+    subtract base point, scale per axis, rotate, then move to the insert point"""
+    x = (point[0] - base[0]) * scale[0]
+    y = (point[1] - base[1]) * scale[1]
+    c, s = math.cos(math.radians(rotation)), math.sin(math.radians(rotation))
+    return (x * c - y * s + insert[0], x * s + y * c + insert[1])
+
+
+class TestExplodeBlock(unittest.TestCase):
+    def setUp(self):
+        self.doc = ezdxf.new()
+        inner = self.doc.blocks.new("INNER", base_point=(1, 0))
+        inner.add_line((0, 0), (2, 0))
+        inner.add_line((2, 0), (2, 1))
+        inner.add_text("T", dxfattribs={"insert": (1, 1)})
+
+        outer = self.doc.blocks.new("OUTER")
+        outer.add_line((0, 0), (0, 3))
+        # Nested, rotated and non-uniformly scaled inside a non-uniformly scaled parent
+        outer.add_blockref("INNER", (5, 2), dxfattribs={"rotation": 30, "xscale": 2, "yscale": 0.5})
+
+        self.insert = self.doc.modelspace().add_blockref(
+            "OUTER", (100, 50), dxfattribs={"rotation": 90, "xscale": 3, "yscale": 1.5}
+        )
+
+    def to_world(self, point, nested=False):
+        if nested:
+            point = place(point, (1, 0), (2, 0.5), 30, (5, 2))
+        return place(point, (0, 0), (3, 1.5), 90, (100, 50))
+
+    def test_nested_rotated_non_uniform(self):
+        segments, texts = explode_block(self.insert, self.doc)
+
+        expected = [
+            (self.to_world((0, 0)), self.to_world((0, 3))),
+            (self.to_world((0, 0), True), self.to_world((2, 0), True)),
+            (self.to_world((2, 0), True), self.to_world((2, 1), True)),
+        ]
+        got = [((s.start.x, s.start.y), (s.end.x, s.end.y)) for s in segments]
+        self.assertEqual(len(got), len(expected))
+        for (a, b), (ea, eb) in zip(sorted(got), sorted(expected)):
+            for v, e in zip(a + b, ea + eb):
+                self.assertAlmostEqual(v, e)
+
+        self.assertEqual(len(texts), 1)
+        tx, ty = self.to_world((1, 1), True)
+        self.assertAlmostEqual(texts[0].position.x, tx)
+        self.assertAlmostEqual(texts[0].position.y, ty)
+
+
+if __name__ == "__main__":
+    unittest.main()
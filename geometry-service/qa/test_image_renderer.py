@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+import ezdxf
+from PIL import Image
+
+from vision.image_renderer import render_dxf_to_image
+
+
+class TestRenderDxfToImage(unittest.TestCase):
+    def render(self, width, height):
+        doc = ezdxf.new()
+        doc.modelspace().add_lwpolyline([(0, 0), (width, 0), (width, height), (0, height)], close=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            dxf_path = os.path.join(tmp, "plan.dxf")
+            doc.saveas(dxf_path)
+            out = render_dxf_to_image(dxf_path, output_path=os.path.join(tmp, "plan.png"), dpi=100)
+            with Image.open(out) as img:
+                img = img.convert("L")
+                # Extent of the ink (everything darker than the white background)
+                ink = img.point(lambda v: 255 if v < 128 else 0).getbbox()
+                return img.size, ink
+
+    def test_image_matches_drawing_aspect(self):
+        for width, height in [(10000, 1000), (1000, 1000), (300, 4000)]:
+            (w, h), ink = self.render(width, height)
+            self.assertAlmostEqual(w / h, width / height, delta=0.05 * width / height)
+            # Drawing fills the image: no letterbox margins (1-2px of antialiasing)
+            for got, edge in zip(ink, (0, 0, w, h)):
+                self.assertLessEqual(abs(got - edge), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
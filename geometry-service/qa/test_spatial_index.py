@@ -0,0 +1,37 @@
+import unittest
+import shapely
+from core.spatial_index import SpatialIndex
+from shapely.geometry import Polygon
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.room = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+        self.closet = Polygon([(1, 1), (3, 1), (3, 3), (1, 3)])
+        self.index = SpatialIndex([
+            (self.room, "A-FLOOR", "room"),
+            (self.closet, "A-FLOOR", "closet"),
+        ])
+
+    def test_find_zone_prefers_smallest(self):
+        self.assertEqual(self.index.find_zone(2, 2)["handle"], "closet")
+        self.assertEqual(self.index.find_zone(8, 8)["handle"], "room")
+        self.assertIsNone(self.index.find_zone(20, 20))
+
+    def test_find_zones_batch(self):
+        pts = shapely.points([2.0, 8.0, 20.0], [2.0, 8.0, 20.0])
+        self.assertEqual(self.index.find_zones_batch(pts), ["closet", "room", None])
+
+        handles, dists = self.index.find_nearest_zones_batch(shapely.points([10.5, 20.0], [5.0, 20.0]), 1.0)
+        self.assertEqual(handles, ["room", None])
+        self.assertAlmostEqual(dists[0], 0.5)
+
+    def test_find_nearest_zone(self):
+        zone = self.index.find_nearest_zone(10.5, 5, max_distance=1.0)
+        self.assertEqual(zone["handle"], "room")
+        self.assertAlmostEqual(zone["distance"], 0.5)
+        self.assertIsNone(self.index.find_nearest_zone(20, 20, max_distance=1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ Verifies that the new SpatialIndex correctly links Text to Regions.
 """
 from core.spatial_index import SpatialIndex
 from core.text_associator import associate_text_to_regions, Label, ExcelItem
-from shapely.geometry import Polygon
+from shapely.geometry import Polygon, Point
 from dataclasses import dataclass
 import logging
 
@@ -43,8 +43,8 @@ def test_spatial_association():
     # "SALA DE VENTAS" is inside logic (at 5,5)
     # "EXTERIOR" is outside (at 15,15)
     labels = [
-        Label(text="SALA DE VENTAS", position=type('obj', (object,), {'x': 5, 'y': 5})),
-        Label(text="PATIO EXTERIOR", position=type('obj', (object,), {'x': 15, 'y': 15}))
+        Label(text="SALA DE VENTAS", position=Point(5, 5)),
+        Label(text="PATIO EXTERIOR", position=Point(15, 15))
     ]
     
     # 4. Create Excel Items to Match
@@ -77,5 +77,25 @@ def test_spatial_association():
     else:
         print(f"❌ FAILURE: Should not have matched outside text. Got: {patio_match.match_reason}")
 
+def test_label_without_position():
+    # A positionless label is skipped; the positioned duplicate still matches
+    floor = MockRegion(
+        id="region_1",
+        shapely_polygon=Polygon([(0,0), (10,0), (10,10), (0,10)]),
+        layer="mb-auxiliar",
+        area=100.0,
+        perimeter=40.0
+    )
+    labels = [
+        Label(text="SALA DE VENTAS", position=None),
+        Label(text="SALA DE VENTAS", position=Point(5, 5))
+    ]
+    items = [ExcelItem(id="1", description="Pavimento Sala de Ventas", unit="m2")]
+    
+    matches = associate_text_to_regions([floor], labels, items)
+    assert matches[0].region is floor
+    assert matches[0].qty_calculated == 100.0
+
 if __name__ == "__main__":
     test_spatial_association()
+    test_label_without_position()
@@ -0,0 +1,25 @@
+import unittest
+
+from shapely.geometry import box
+
+from core.spatial_text_matcher import SpatialTextMatcher
+
+
+class TestSpatialTextMatcher(unittest.TestCase):
+    def test_top_ten_ties_keep_text_order(self):
+        # 5 texts just outside the region, then 15 inside (all relevance 1.0)
+        texts = [{'content': f't{i}', 'position': (21 + i * 0.1, 5, 0)} for i in range(5)]
+        texts += [{'content': f't{i}', 'position': (i - 4, 5, 0)} for i in range(5, 20)]
+
+        for use_spatial_index in (True, False):
+            regions = [{'id': 'R1', 'polygon': box(0, 0, 20, 10)}]
+            matcher = SpatialTextMatcher(use_spatial_index=use_spatial_index)
+            region = matcher.associate_texts_to_regions(regions, texts)[0]
+
+            got = [t['content'] for t in region['associated_texts']]
+            self.assertEqual(got, [f't{i}' for i in range(5, 15)])
+            self.assertTrue(all(t['relevance'] == 1.0 for t in region['associated_texts']))
+
+
+if __name__ == "__main__":
+    unittest.main()
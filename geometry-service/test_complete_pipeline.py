@@ -13,23 +13,31 @@ This is the full pipeline test to validate TAB 01 = 62.38 m²
 import sys
 import os
 import json
+import hashlib
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import fitz  # PyMuPDF
-import tempfile
+import numpy as np
+import shapely
 
 from core.dxf_parser import parse_dxf_file
-from core.geometry_cleanup import cleanup_geometry, Segment, Point
-from core.region_extractor import extract_regions, Region as ExtractorRegion
+from core.geometry_cleanup import cleanup_geometry
+from core.region_extractor import extract_regions, Region as ExtractorRegion, Point as RegionPoint
+from core.spatial_index import SpatialIndex
 from vision.label_detector import detect_labels
+from qa.result_cache import CACHE_DIR, _source_digest
 
 # Paths
 DXF_PATH = os.path.join(os.path.dirname(__file__), "..", "LDS_PAK - (LC) (1).dxf")
 PDF_PATH = os.path.join(os.path.dirname(__file__), "..", "LDS_PAK - (LC)-02_CONSTRUCCION.pdf")
 
+
+# Vision AI responses, keyed by image content (see detect_labels cache_dir)
+LABEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "labels")
+
 # Expected values
 EXPECTED = {
     "TAB 01": 62.38,
@@ -41,66 +49,155 @@ EXPECTED = {
 
 
 def render_pdf_to_image(pdf_path: str, dpi: int = 150):
-    """Render PDF to image for Vision AI"""
-    doc = fitz.open(pdf_path)
-    page = doc[0]
-    mat = fitz.Matrix(dpi / 72, dpi / 72)
-    pix = page.get_pixmap(matrix=mat)
+    """Render PDF to an in-memory PNG for Vision AI"""
+    with fitz.open(pdf_path) as doc:
+        page = doc[0]
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)  # Ink on white: gray is enough
+        png_bytes = pix.tobytes("png")
+    
+    return png_bytes, (pix.width, pix.height)
+
+
+def region_cache_path(dxf_path: str):
+    """
+    .cache/ file for the DXF's extracted regions, or None unless GEOMETRY_CACHE
+    is set. The name hashes the path and the core/ sources, so editing the
+    parser or cleanup code starts a fresh entry.
+    """
+    if not os.getenv("GEOMETRY_CACHE"):
+        return None
+    key = repr((os.path.abspath(dxf_path), _source_digest()))
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, f"regions-{digest}.npz")
+
+
+def _dxf_cache_key(dxf_path: str) -> np.ndarray:
+    st = os.stat(dxf_path)
+    return np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+
+def save_cached_regions(cache_path: str, dxf_path: str, regions) -> None:
+    """
+    Store regions as one WKB blob (plus offsets) and flat id/layer/area/
+    perimeter arrays, keyed by the DXF's mtime and size.
+    """
+    wkbs = shapely.to_wkb([r.shapely_polygon for r in regions]).tolist()
+    offsets = np.zeros(len(wkbs) + 1, dtype=np.int64)
+    np.cumsum([len(w) for w in wkbs], out=offsets[1:])
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Write-then-rename so a concurrent run never reads a partial file
+    tmp_file = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(
+            f,
+            key=_dxf_cache_key(dxf_path),
+            wkb=np.frombuffer(b"".join(wkbs), dtype=np.uint8),
+            offsets=offsets,
+            ids=np.array([r.id for r in regions], dtype=str),
+            layers=np.array([r.layer for r in regions], dtype=str),
+            area=np.array([r.area for r in regions], dtype=np.float64),
+            perimeter=np.array([r.perimeter for r in regions], dtype=np.float64),
+        )
+    os.replace(tmp_file, cache_path)
+
+
+def load_cached_regions(cache_path: str, dxf_path: str):
+    """Regions stored by save_cached_regions, or None if disabled, missing or stale"""
+    if cache_path is None or not os.path.exists(cache_path):
+        return None
     
-    fd, image_path = tempfile.mkstemp(suffix=".png")
-    os.close(fd)
-    pix.save(image_path)
-    doc.close()
+    with np.load(cache_path) as data:
+        if not np.array_equal(data["key"], _dxf_cache_key(dxf_path)):
+            return None
+        blob = data["wkb"].tobytes()
+        offsets = data["offsets"].tolist()
+        polys = shapely.from_wkb([blob[a:b] for a, b in zip(offsets[:-1], offsets[1:])])
+        ids = data["ids"].tolist()
+        layers = data["layers"].tolist()
+        areas = data["area"].tolist()
+        perimeters = data["perimeter"].tolist()
     
-    return image_path, (pix.width, pix.height)
+    regions = []
+    for poly, rid, layer, area, perimeter in zip(polys, ids, layers, areas, perimeters):
+        centroid = poly.centroid
+        regions.append(ExtractorRegion(
+            id=rid,
+            vertices=[RegionPoint(x, y) for x, y in poly.exterior.coords[:-1]],
+            area=area,
+            perimeter=perimeter,
+            centroid=RegionPoint(centroid.x, centroid.y),
+            shapely_polygon=poly,
+            layer=layer
+        ))
+    return regions
+
+
+def build_region_index(regions):
+    """STRtree-backed index over region polygons; the region is the handle"""
+    return SpatialIndex([(r.shapely_polygon, r.layer, r) for r in regions])
 
 
-def find_region_for_label(label, regions, image_size, dxf_bounds):
+def labels_to_dxf_coords(labels, dxf_bounds):
     """
-    Convert label bbox from image coordinates to DXF coordinates
-    and find the region that contains or is nearest to the label.
+    Convert label bboxes from image coordinates (percentage of image,
+    0-100) to DXF coordinates of their centers, for all labels at once.
+    Returns (xs, ys) arrays aligned with labels.
     """
-    # Label bbox is in percentage of image (0-100)
-    # Convert to DXF coordinates
-    img_w, img_h = image_size
     dxf_min_x, dxf_min_y, dxf_max_x, dxf_max_y = dxf_bounds
     dxf_width = dxf_max_x - dxf_min_x
     dxf_height = dxf_max_y - dxf_min_y
     
-    # Get label centroid in percentage
-    x_pct = (label.bbox[0] + label.bbox[2]) / 2 / 100
-    y_pct = (label.bbox[1] + label.bbox[3]) / 2 / 100
+    bb = np.array([l.bbox[:4] for l in labels], dtype=np.float64).reshape(-1, 4)
+    
+    # Get label centroids in percentage
+    x_pct = (bb[:, 0] + bb[:, 2]) / 2 / 100
+    y_pct = (bb[:, 1] + bb[:, 3]) / 2 / 100
     
     # Convert to DXF coordinates
-    label_x = dxf_min_x + x_pct * dxf_width
-    label_y = dxf_max_y - y_pct * dxf_height  # Y is inverted
-    
-    # Find region containing this point
-    best_region = None
-    best_score = -1
-    
-    for region in regions:
-        # Check if point is inside (simplified check)
-        if region.shapely_polygon.contains_properly(fitz.Point(label_x, label_y)):
-            # Prefer smaller regions (more specific)
-            if best_region is None or region.area < best_region.area:
-                best_region = region
-                best_score = 1.0
-        else:
-            # Check distance
-            try:
-                from shapely.geometry import Point as ShapelyPoint
-                pt = ShapelyPoint(label_x, label_y)
-                dist = region.shapely_polygon.distance(pt)
-                if dist < 5:  # Within 5 meters
-                    score = 1.0 - dist / 5.0
-                    if score > best_score:
-                        best_score = score
-                        best_region = region
-            except:
-                pass
-    
-    return best_region, best_score
+    xs = dxf_min_x + x_pct * dxf_width
+    ys = dxf_max_y - y_pct * dxf_height  # Y is inverted
+    return xs, ys
+
+
+def find_region_for_label(label, regions, image_size, dxf_bounds, index=None):
+    """
+    Convert label bbox from image coordinates to DXF coordinates
+    and find the region that contains or is nearest to the label.
+    
+    index: SpatialIndex over regions; build it once and pass it in when
+    looking up many labels (or use find_regions_for_labels).
+    """
+    return find_regions_for_labels([label], regions, image_size, dxf_bounds, index)[0]
+
+
+def find_regions_for_labels(labels, regions, image_size, dxf_bounds, index=None):
+    """
+    Batched find_region_for_label: one coordinate conversion and one
+    containment query for all labels. Returns [(region, score)] aligned
+    with labels.
+    """
+    if index is None:
+        index = build_region_index(regions)
+    
+    xs, ys = labels_to_dxf_coords(labels, dxf_bounds)
+    points = shapely.points(xs, ys)
+    
+    # Find region containing each point (tree query; smallest area wins,
+    # since smaller regions are more specific)
+    zones = index.find_zones_batch(points)
+    results = [(zone, 1.0) if zone is not None else (None, -1) for zone in zones]
+    
+    # Otherwise the nearest region within 5 m, one bounded nearest-neighbour
+    # query for all remaining labels
+    missing = [k for k, zone in enumerate(zones) if zone is None]
+    if missing:
+        nearest, dists = index.find_nearest_zones_batch(points[missing], max_distance=5.0)
+        for k, region, dist in zip(missing, nearest, dists.tolist()):
+            if region is not None and dist < 5:  # Within 5 meters
+                results[k] = (region, 1.0 - dist / 5.0)
+    
+    return results
 
 
 def run_complete_pipeline():
@@ -116,7 +213,7 @@ def run_complete_pipeline():
     # Step 1: Render PDF for Vision AI
     print("\n📸 Step 1: Rendering PDF...")
     try:
-        image_path, image_size = render_pdf_to_image(PDF_PATH, dpi=150)
+        png_bytes, image_size = render_pdf_to_image(PDF_PATH, dpi=150)
         print(f"   ✅ Rendered {image_size[0]}x{image_size[1]} pixels")
     except Exception as e:
         print(f"   ❌ Failed: {e}")
@@ -125,7 +222,7 @@ def run_complete_pipeline():
     # Step 2: Vision AI Label Detection
     print("\n🔭 Step 2: Vision AI detecting labels...")
     try:
-        result = detect_labels(image_path=image_path, model="gpt4v")
+        result = detect_labels(image_bytes=png_bytes, model="gpt4v", cache_dir=LABEL_CACHE_DIR)
         print(f"   ✅ Detected {len(result.labels)} labels")
         
         # Show construction-related labels
@@ -150,25 +247,23 @@ def run_complete_pipeline():
     # Step 3: Parse DXF and extract regions
     print("\n📐 Step 3: Extracting regions from DXF...")
     try:
-        dxf_result = parse_dxf_file(DXF_PATH)
-        print(f"   Parsed {len(dxf_result.segments)} segments")
-        
-        segments = [
-            Segment(
-                start=Point(s.start.x, s.start.y),
-                end=Point(s.end.x, s.end.y),
-                layer=s.layer,
-                entity_type=s.entity_type
-            )
-            for s in dxf_result.segments
-        ]
-        
-        cleaned = cleanup_geometry(segments, snap_tolerance=0.01, 
-                                   merge_collinear_enabled=False, close_gaps=True)
-        print(f"   Cleaned to {len(cleaned)} segments")
-        
-        regions = extract_regions(cleaned, method="shapely")
-        print(f"   ✅ Extracted {len(regions)} regions")
+        region_cache = region_cache_path(DXF_PATH)
+        regions = load_cached_regions(region_cache, DXF_PATH)
+        if regions is not None:
+            print(f"   ✅ Loaded {len(regions)} regions from cache")
+        else:
+            dxf_result = parse_dxf_file(DXF_PATH)
+            print(f"   Parsed {len(dxf_result.segments)} segments")
+            
+            # Parser segments go straight in; no per-segment re-wrap
+            cleaned = cleanup_geometry(dxf_result.segments, snap_tolerance=0.01, 
+                                       merge_collinear_enabled=False, close_gaps=True)
+            print(f"   Cleaned to {len(cleaned)} segments")
+            
+            regions = extract_regions(cleaned, method="shapely")
+            print(f"   ✅ Extracted {len(regions)} regions")
+            if region_cache is not None:
+                save_cached_regions(region_cache, DXF_PATH, regions)
         
     except Exception as e:
         print(f"   ❌ DXF processing failed: {e}")
@@ -181,28 +276,32 @@ def run_complete_pipeline():
     print(f"\n   {'Expected Item':<20} {'Expected m²':>12} {'Best Match':>12} {'Diff':>8}")
     print("   " + "-" * 56)
     
-    for item_name, expected_area in EXPECTED.items():
+    # Region areas once; closest region per expected item in one pass
+    areas = np.fromiter((r.area for r in regions), dtype=np.float64, count=len(regions))
+    expected = np.fromiter(EXPECTED.values(), dtype=np.float64, count=len(EXPECTED))
+    closest_idx = np.abs(areas[:, None] - expected[None, :]).argmin(axis=0)
+    
+    for (item_name, expected_area), ci in zip(EXPECTED.items(), closest_idx):
         # Find closest region by area
-        closest = min(regions, key=lambda r: abs(r.area - expected_area))
+        closest = regions[ci]
         diff = abs(closest.area - expected_area) / expected_area * 100
         status = "✅" if diff < 15 else "⚠️" if diff < 40 else "❌"
         
         print(f"   {item_name:<20} {expected_area:>12.2f} {closest.area:>12.2f} {diff:>7.0f}% {status}")
     
-    # Show top regions
+    # Show top regions: the 15th largest area via partial selection, then
+    # order only the regions at or above it (largest first, ties in
+    # extraction order, like a stable sort)
+    k = min(15, len(regions))
+    top = np.flatnonzero(areas >= -np.partition(-areas, k - 1)[k - 1]) if k else np.arange(0)
+    top = top[np.lexsort((top, -areas[top]))][:k]
     print("\n   Top 15 regions by area (for reference):")
-    for i, r in enumerate(sorted(regions, key=lambda x: x.area, reverse=True)[:15]):
+    for i, r in enumerate(regions[j] for j in top):
         # Check if close to any expected value
         matches = [name for name, val in EXPECTED.items() if abs(r.area - val) / val < 0.2]
         match_str = f" ← possible {matches[0]}" if matches else ""
         print(f"     {i+1:2}. {r.area:8.2f} m²{match_str}")
     
-    # Cleanup
-    try:
-        os.unlink(image_path)
-    except:
-        pass
-    
     print("\n" + "=" * 70)
     print("✅ Pipeline Complete!")
     print("=" * 70)
@@ -6,11 +6,13 @@ Tests the complete pipeline: DXF → Regions → Text Association → Measuremen
 import sys
 import os
 import json
+import heapq
+import re
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core.dxf_parser import parse_dxf_file
-from core.geometry_cleanup import cleanup_geometry, Segment, Point
+from core.geometry_cleanup import cleanup_geometry, Point
 from core.region_extractor import extract_regions, Region as ExtractorRegion
 from core.text_associator import (
     associate_text_to_regions, 
@@ -18,10 +20,14 @@ from core.text_associator import (
     Region as AssociatorRegion,
     ExcelItem
 )
+from qa.result_cache import load_or_compute  # opt-in parse/cleanup cache: GEOMETRY_CACHE=1
 
 # Paths
 DXF_PATH = os.path.join(os.path.dirname(__file__), "..", "LDS_PAK - (LC) (1).dxf")
 
+# Label keywords worth listing in the Step 4 preview
+RELEVANT_KEYWORDS = re.compile(r'TAB|CIELO|PISO|MURO|SALA|SOBRE', re.IGNORECASE)
+
 # Expected values from validation CSV
 EXPECTED_ITEMS = [
     {"id": "1", "description": "TAB 01 - Tabique", "unit": "m2", "expected_qty": 62.38},
@@ -40,28 +46,21 @@ def run_full_pipeline():
     
     # Step 1: Parse DXF
     print("\n📁 Step 1: Parsing DXF...")
-    parse_result = parse_dxf_file(DXF_PATH)
+    parse_result = load_or_compute(DXF_PATH, "parse", lambda: parse_dxf_file(DXF_PATH))
     print(f"   ✅ {len(parse_result.segments)} segments, {len(parse_result.texts)} texts")
     
     # Step 2: Cleanup
     print("\n🧹 Step 2: Geometry Cleanup...")
-    segments = [
-        Segment(
-            start=Point(s.start.x, s.start.y),
-            end=Point(s.end.x, s.end.y),
-            layer=s.layer,
-            entity_type=s.entity_type
-        )
-        for s in parse_result.segments
-    ]
+    # Parser segments are accepted by cleanup_geometry as-is
+    segments = parse_result.segments
     
-    cleaned = cleanup_geometry(
-        segments,
+    cleanup_params = dict(
         snap_tolerance=0.01,
         merge_collinear_enabled=False,  # Skip for speed
         close_gaps=True,
         max_gap=0.05
     )
+    cleaned = load_or_compute(DXF_PATH, "cleanup", lambda: cleanup_geometry(segments, **cleanup_params), **cleanup_params)
     print(f"   ✅ {len(cleaned)} segments after cleanup")
     
     # Step 3: Extract regions
@@ -91,8 +90,7 @@ def run_full_pipeline():
         ))
     
     # Show some relevant labels
-    relevant_keywords = ['TAB', 'CIELO', 'PISO', 'MURO', 'SALA', 'SOBRE']
-    relevant_labels = [l for l in labels if any(kw in l.text.upper() for kw in relevant_keywords)]
+    relevant_labels = [l for l in labels if RELEVANT_KEYWORDS.search(l.text)]
     print(f"   Found {len(relevant_labels)} relevant labels:")
     for l in relevant_labels[:15]:
         print(f"     - '{l.text}' at ({l.position.x:.2f}, {l.position.y:.2f})")
@@ -146,7 +144,7 @@ def run_full_pipeline():
     
     # Show top regions that might be the missing ones
     print("\n📐 Top 20 Regions by Area (for reference):")
-    for i, r in enumerate(sorted(regions, key=lambda x: x.area, reverse=True)[:20]):
+    for i, r in enumerate(heapq.nlargest(20, regions, key=lambda x: x.area)):
         print(f"   {i+1:2}. {r.area:8.2f} m²")
     
     return matches
@@ -10,8 +10,9 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core.dxf_parser import parse_dxf_file
-from core.geometry_cleanup import cleanup_geometry, Segment, Point
+from core.geometry_cleanup import cleanup_geometry
 from core.region_extractor import extract_regions
+from qa.result_cache import load_or_compute  # opt-in parse/cleanup cache: GEOMETRY_CACHE=1
 
 # Path to test DXF
 DXF_PATH = os.path.join(os.path.dirname(__file__), "..", "LDS_PAK - (LC) (1).dxf")
@@ -28,7 +29,7 @@ def test_dxf_parsing():
         return None
     
     try:
-        result = parse_dxf_file(DXF_PATH)
+        result = load_or_compute(DXF_PATH, "parse", lambda: parse_dxf_file(DXF_PATH))
         print(f"✅ Parsed successfully!")
         print(f"   • Segments: {len(result.segments)}")
         print(f"   • Texts: {len(result.texts)}")
@@ -59,16 +60,8 @@ def test_geometry_cleanup(parse_result, fast_mode=False):
         print("⏭️ Skipped (no parse result)")
         return None
     
-    # Convert to cleanup module's format
-    segments = [
-        Segment(
-            start=Point(s.start.x, s.start.y),
-            end=Point(s.end.x, s.end.y),
-            layer=s.layer,
-            entity_type=s.entity_type
-        )
-        for s in parse_result.segments
-    ]
+    # Parser segments are accepted by cleanup_geometry as-is
+    segments = parse_result.segments
     
     # For large files, skip slow operations
     merge_enabled = not fast_mode and len(segments) < 50000
@@ -76,13 +69,13 @@ def test_geometry_cleanup(parse_result, fast_mode=False):
         print(f"⚡ Fast mode: skipping collinear merge ({len(segments)} segments)")
     
     try:
-        cleaned = cleanup_geometry(
-            segments,
+        cleanup_params = dict(
             snap_tolerance=0.01,
             merge_collinear_enabled=merge_enabled,
             close_gaps=True,
             max_gap=0.05
         )
+        cleaned = load_or_compute(DXF_PATH, "cleanup", lambda: cleanup_geometry(segments, **cleanup_params), **cleanup_params)
         
         print(f"✅ Cleanup completed!")
         print(f"   • Input segments: {len(segments)}")
@@ -47,21 +47,16 @@ def test_vision_detection():
     print("\n📸 Step 1: Rendering PDF to high-res image...")
     try:
         import fitz  # PyMuPDF
-        import tempfile
         
-        doc = fitz.open(PDF_PATH)
-        page = doc[0]
-        mat = fitz.Matrix(200 / 72, 200 / 72)  # 200 DPI
-        pix = page.get_pixmap(matrix=mat)
+        with fitz.open(PDF_PATH) as doc:
+            page = doc[0]
+            mat = fitz.Matrix(200 / 72, 200 / 72)  # 200 DPI
+            pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)  # Ink on white: gray is enough
         
-        # Create temp file and close it before PyMuPDF writes to it
-        fd, image_path = tempfile.mkstemp(suffix=".png")
-        os.close(fd)  # Close the file descriptor so PyMuPDF can write
+        # Encode in memory (no temp file round trip)
+        image_bytes = pix.tobytes("png")
         
-        pix.save(image_path)
-        doc.close()
-        
-        print(f"   ✅ Rendered to: {image_path}")
+        print(f"   ✅ Rendered to PNG: {len(image_bytes) / 1024:.0f} KB")
         print(f"   Image size: {pix.width}x{pix.height} pixels")
     except Exception as e:
         print(f"   ❌ Render failed: {e}")
@@ -75,7 +70,7 @@ def test_vision_detection():
     print(f"   Using model: {model}")
     
     try:
-        result = detect_labels(image_path=image_path, model=model)
+        result = detect_labels(image_bytes=image_bytes, model=model)
         
         print(f"\n   ✅ Detection complete!")
         print(f"   Model used: {result.model_used}")
@@ -93,12 +88,6 @@ def test_vision_detection():
         print(f"   ❌ Detection failed: {e}")
         import traceback
         traceback.print_exc()
-    
-    # Cleanup temp image
-    try:
-        os.unlink(image_path)
-    except:
-        pass
 
 
 if __name__ == "__main__":
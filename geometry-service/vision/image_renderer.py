@@ -4,13 +4,29 @@ Image Renderer - Convert DXF/PDF to high-resolution images
 For use with Vision AI and visual debugging.
 """
 import ezdxf
-from ezdxf.addons.drawing import Frontend, RenderContext
-from ezdxf.addons.drawing.matplotlib import MatplotlibBackend
-import matplotlib.pyplot as plt
-from PIL import Image
+from ezdxf.addons.drawing import Frontend, RenderContext, config, layout, pymupdf
+from PIL import Image, ImageColor
+import multiprocessing
+from functools import lru_cache
 import tempfile
 import os
-from typing import Optional
+from typing import List, Optional
+
+# Smallest page edge (inches) for drawings with zero width or height
+MIN_PAGE_EDGE = 0.05
+
+
+def _fit_page(bbox, max_width: float = 6.4, max_height: float = 4.8) -> layout.Page:
+    """Largest page (inches) within max_width x max_height with the aspect ratio of bbox"""
+    if not bbox.has_data:
+        return layout.Page(max_width, max_height, layout.Units.inch)
+    size = bbox.size
+    scale = min(max_width / max(size.x, 1e-9), max_height / max(size.y, 1e-9))
+    # Keep degenerate extents (e.g. a single straight line) at least a thin
+    # strip; a zero-sized page would make ezdxf fall back to its default size
+    width = max(size.x * scale, MIN_PAGE_EDGE)
+    height = max(size.y * scale, MIN_PAGE_EDGE)
+    return layout.Page(width, height, layout.Units.inch)
 
 
 def render_dxf_to_image(
@@ -35,24 +51,21 @@ def render_dxf_to_image(
     doc = ezdxf.readfile(dxf_path)
     msp = doc.modelspace()
     
-    # Set up matplotlib figure
-    fig = plt.figure(dpi=dpi)
-    ax = fig.add_axes([0, 0, 1, 1])
-    
-    # Create render context and backend
-    ctx = RenderContext(doc)
-    out = MatplotlibBackend(ax)
-    
-    # Render
-    Frontend(ctx, out).draw_layout(msp)
+    # Background as a custom color (accepts names like "white" or "#rrggbb")
+    bg_hex = "#%02x%02x%02x" % ImageColor.getrgb(background)[:3]
+    cfg = config.Configuration(
+        background_policy=config.BackgroundPolicy.CUSTOM,
+        custom_bg_color=bg_hex
+    )
     
-    # Configure appearance
-    ax.set_facecolor(background)
-    ax.set_aspect('equal')
-    ax.autoscale()
+    # Render straight to a PyMuPDF page (no matplotlib figure/axes)
+    backend = pymupdf.PyMuPdfBackend()
+    Frontend(RenderContext(doc), backend, config=cfg).draw_layout(msp)
     
-    # Remove axes
-    ax.set_axis_off()
+    # Page shaped like the drawing extents (fit into 6.4x4.8 in), so image
+    # pixels map linearly onto DXF coordinates like the old tight-cropped figure
+    page = _fit_page(backend.player().bbox())
+    png_bytes = backend.get_pixmap_bytes(page, fmt="png", dpi=dpi)
     
     # Save
     if output_path is None:
@@ -60,9 +73,8 @@ def render_dxf_to_image(
         output_path = tmp.name
         tmp.close()
     
-    fig.savefig(output_path, dpi=dpi, bbox_inches='tight', 
-                facecolor=background, edgecolor='none')
-    plt.close(fig)
+    with open(output_path, "wb") as f:
+        f.write(png_bytes)
     
     return output_path
 
@@ -71,7 +83,8 @@ def render_pdf_page_to_image(
     pdf_path: str,
     page_num: int = 0,
     output_path: Optional[str] = None,
-    dpi: int = 300
+    dpi: int = 300,
+    grayscale: bool = False
 ) -> str:
     """
     Render a PDF page to a high-resolution image.
@@ -81,6 +94,8 @@ def render_pdf_page_to_image(
         page_num: Page number (0-indexed)
         output_path: Optional output path
         dpi: Resolution
+        grayscale: Render single-channel (3x smaller buffer; fine for
+            black-on-white drawings sent to Vision AI)
     
     Returns:
         Path to generated image
@@ -92,7 +107,8 @@ def render_pdf_page_to_image(
             pdf_path,
             dpi=dpi,
             first_page=page_num + 1,
-            last_page=page_num + 1
+            last_page=page_num + 1,
+            grayscale=grayscale
         )
         
         if not images:
@@ -104,14 +120,16 @@ def render_pdf_page_to_image(
         # Fallback to PyMuPDF
         import fitz
         
-        doc = fitz.open(pdf_path)
-        page = doc[page_num]
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
-        pix = page.get_pixmap(matrix=mat)
+        with fitz.open(pdf_path) as doc:
+            page = doc[page_num]
+            mat = fitz.Matrix(dpi / 72, dpi / 72)
+            colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+            pix = page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
         
         # Convert to PIL
-        image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        doc.close()
+        mode = "L" if grayscale else "RGB"
+        image = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+        del pix
     
     # Save
     if output_path is None:
@@ -119,11 +137,54 @@ def render_pdf_page_to_image(
         output_path = tmp.name
         tmp.close()
     
-    image.save(output_path, "PNG")
+    with image:
+        image.save(output_path, "PNG")
     
     return output_path
 
 
+def render_pdf_pages(
+    pdf_path: str,
+    pages: List[int],
+    dpi: int = 300,
+    grayscale: bool = False,
+    processes: Optional[int] = None
+) -> List[str]:
+    """
+    Render several PDF pages to images, one worker process per page.
+    
+    Each worker opens the PDF itself (documents are not shared across
+    processes), so sheets render in parallel.
+    
+    Args:
+        pdf_path: Path to PDF file
+        pages: Page numbers (0-indexed)
+        dpi: Resolution
+        grayscale: Render single-channel (see render_pdf_page_to_image)
+        processes: Worker count (defaults to min(len(pages), cpu_count))
+    
+    Returns:
+        Image paths, in the order of pages
+    """
+    args = [(pdf_path, page_num, None, dpi, grayscale) for page_num in pages]
+    if len(args) <= 1:
+        return [render_pdf_page_to_image(*a) for a in args]
+    
+    processes = processes or min(len(args), os.cpu_count() or 1)
+    with multiprocessing.Pool(processes=processes) as pool:
+        return pool.starmap(render_pdf_page_to_image, args)
+
+
+@lru_cache(maxsize=1)
+def _overlay_font():
+    """Label font for debug overlays, loaded once per process"""
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("arial.ttf", 12)
+    except OSError:
+        return ImageFont.load_default()
+
+
 def create_debug_overlay(
     base_image_path: str,
     regions: list,
@@ -143,43 +204,40 @@ def create_debug_overlay(
     Returns:
         Path to overlay image
     """
-    from PIL import ImageDraw, ImageFont
-    
-    # Load base image
-    img = Image.open(base_image_path)
-    draw = ImageDraw.Draw(img, 'RGBA')
-    
-    # Draw regions as semi-transparent polygons
-    for i, region in enumerate(regions):
-        if hasattr(region, 'vertices'):
-            points = [(v.x, v.y) for v in region.vertices]
-            # Random color based on index
-            color = (
-                (i * 67) % 255,
-                (i * 137) % 255,
-                (i * 97) % 255,
-                100  # Alpha
-            )
-            draw.polygon(points, fill=color, outline=(0, 0, 0, 255))
-    
-    # Draw labels
-    try:
-        font = ImageFont.truetype("arial.ttf", 12)
-    except:
-        font = ImageFont.load_default()
-    
-    for label in labels:
-        if hasattr(label, 'bbox'):
-            x1, y1, x2, y2 = label.bbox
-            draw.rectangle([x1, y1, x2, y2], outline=(255, 0, 0, 255), width=2)
-            draw.text((x1, y1 - 15), label.text, fill=(255, 0, 0, 255), font=font)
+    from PIL import ImageDraw
     
-    # Save
-    if output_path is None:
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix="_debug.png")
-        output_path = tmp.name
-        tmp.close()
-    
-    img.save(output_path, "PNG")
+    # Load base image (closed, with its pixel buffer, once saved)
+    with Image.open(base_image_path) as img:
+        draw = ImageDraw.Draw(img, 'RGBA')
+        
+        # Draw regions as semi-transparent polygons
+        for i, region in enumerate(regions):
+            if hasattr(region, 'vertices'):
+                points = [(v.x, v.y) for v in region.vertices]
+                # Random color based on index
+                color = (
+                    (i * 67) % 255,
+                    (i * 137) % 255,
+                    (i * 97) % 255,
+                    100  # Alpha
+                )
+                draw.polygon(points, fill=color, outline=(0, 0, 0, 255))
+        
+        # Draw labels
+        font = _overlay_font()
+        
+        for label in labels:
+            if hasattr(label, 'bbox'):
+                x1, y1, x2, y2 = label.bbox
+                draw.rectangle([x1, y1, x2, y2], outline=(255, 0, 0, 255), width=2)
+                draw.text((x1, y1 - 15), label.text, fill=(255, 0, 0, 255), font=font)
+        
+        # Save
+        if output_path is None:
+            tmp = tempfile.NamedTemporaryFile(delete=False, suffix="_debug.png")
+            output_path = tmp.name
+            tmp.close()
+        
+        img.save(output_path, "PNG")
     
     return output_path
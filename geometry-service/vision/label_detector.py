@@ -7,11 +7,16 @@ in architectural drawings.
 import anthropic
 import openai
 from typing import List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image, UnidentifiedImageError
 import base64
+import hashlib
+import io
 import json
+import mmap
 import os
-import re
 
 
 @dataclass
@@ -36,6 +41,15 @@ class DetectionResult:
     raw_response: str
 
 
+# Longest image edge sent to Vision AI (Claude's effective limit; GPT-4o
+# resizes to 2048 px and below anyway)
+MAX_IMAGE_EDGE = 1568
+
+
+# Bump whenever DETECTION_PROMPT or the response parsing changes, so cached
+# detections (see detect_labels cache_dir) are not reused
+PROMPT_VERSION = 1
+
 DETECTION_PROMPT = """You are an expert at reading Chilean construction and architectural floor plans.
 
 CRITICAL: Scan the ENTIRE image thoroughly. You are looking for text labels that represent:
@@ -86,7 +100,59 @@ IMPORTANT:
 def encode_image(image_path: str) -> str:
     """Encode image to base64 for API submission"""
     with open(image_path, "rb") as f:
-        return base64.standard_b64encode(f.read()).decode("utf-8")
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        # Encode straight from the mapped file instead of a read() copy
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.standard_b64encode(mm).decode("ascii")
+
+
+def _shrink_image(source) -> Optional[Tuple[bytes, str]]:
+    """
+    (bytes, MIME type) of source (path or file object) downscaled to
+    MAX_IMAGE_EDGE in its own format, or None if it is already small enough
+    (or not readable by PIL).
+    
+    The models downscale larger images themselves, so the extra pixels only
+    cost upload and base64 time; bboxes are returned as % of the image.
+    """
+    try:
+        with Image.open(source) as img:
+            if max(img.size) <= MAX_IMAGE_EDGE:
+                return None
+            fmt = img.format or "PNG"
+            img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, fmt)
+            return buf.getvalue(), Image.MIME.get(fmt, "image/png")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        # Send the original bytes unchanged
+        return None
+
+
+@lru_cache(maxsize=4)
+def _encode_image_cached(image_path: str, mtime: float, size: int) -> Tuple[str, str]:
+    """(base64 data, MIME type) memoized on (path, mtime, size) so an unchanged file is read once"""
+    shrunk = _shrink_image(image_path)
+    if shrunk is not None:
+        data, mime = shrunk
+        return base64.standard_b64encode(data).decode("utf-8"), mime
+    return encode_image(image_path), get_image_mime_type(image_path)
+
+
+def _image_payload(
+    image_path: Optional[str],
+    image_bytes: Optional[bytes],
+    image_mime: str = "image/png"
+) -> Tuple[str, str]:
+    """(base64 data, MIME type) from in-memory bytes or a file path"""
+    if image_bytes is not None:
+        shrunk = _shrink_image(io.BytesIO(image_bytes))
+        if shrunk is not None:
+            image_bytes, image_mime = shrunk
+        return base64.standard_b64encode(image_bytes).decode("utf-8"), image_mime
+    stat = os.stat(image_path)
+    return _encode_image_cached(image_path, stat.st_mtime, stat.st_size)
 
 
 def get_image_mime_type(image_path: str) -> str:
@@ -102,15 +168,16 @@ def get_image_mime_type(image_path: str) -> str:
     return mime_types.get(ext, "image/png")
 
 
-def detect_with_claude(image_path: str) -> DetectionResult:
+def detect_with_claude(image_data: str, mime_type: str = "image/png") -> DetectionResult:
     """
     Detect labels using Claude 3.5 Sonnet Vision
+    
+    Args:
+        image_data: Base64-encoded image
+        mime_type: MIME type of the encoded image
     """
     client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
     
-    image_data = encode_image(image_path)
-    mime_type = get_image_mime_type(image_path)
-    
     message = client.messages.create(
         model="claude-3-5-sonnet-20241022",
         max_tokens=4096,
@@ -147,15 +214,16 @@ def detect_with_claude(image_path: str) -> DetectionResult:
     )
 
 
-def detect_with_gpt4v(image_path: str) -> DetectionResult:
+def detect_with_gpt4v(image_data: str, mime_type: str = "image/png") -> DetectionResult:
     """
     Detect labels using GPT-4 Vision
+    
+    Args:
+        image_data: Base64-encoded image
+        mime_type: MIME type of the encoded image
     """
     client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     
-    image_data = encode_image(image_path)
-    mime_type = get_image_mime_type(image_path)
-    
     response = client.chat.completions.create(
         model="gpt-4o",
         max_tokens=4096,
@@ -197,10 +265,11 @@ def parse_detection_response(response_text: str) -> List[Label]:
     labels = []
     
     try:
-        # Try to extract JSON from response
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            data = json.loads(json_match.group())
+        # Try to extract JSON from response (first '{' through last '}')
+        start = response_text.find("{")
+        end = response_text.rfind("}")
+        if start != -1 and end > start:
+            data = json.loads(response_text[start:end + 1])
             
             for item in data.get("labels", []):
                 bbox = item.get("bbox", [0, 0, 0, 0])
@@ -218,10 +287,48 @@ def parse_detection_response(response_text: str) -> List[Label]:
     return labels
 
 
+def _race_detectors(image_data: str, mime_type: str) -> DetectionResult:
+    """
+    Run Claude and GPT-4V concurrently; the first result with labels wins.
+    Falls back to an empty result, and raises only if both models fail.
+    """
+    executor = ThreadPoolExecutor(max_workers=2)
+    pending = {
+        executor.submit(detect_with_claude, image_data, mime_type),
+        executor.submit(detect_with_gpt4v, image_data, mime_type),
+    }
+    empty_result = None
+    error = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Vision detection failed: {e}")
+                    error = e
+                    continue
+                if result.labels:
+                    return result
+                empty_result = empty_result or result
+    finally:
+        # Don't block on the slower request
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if empty_result is not None:
+        return empty_result
+    raise error
+
+
 def detect_labels(
     image_path: Optional[str] = None,
     dxf_path: Optional[str] = None,
-    model: str = "claude"
+    model: str = "claude",
+    image_bytes: Optional[bytes] = None,
+    image_mime: str = "image/png",
+    race: bool = False,
+    cache_dir: Optional[str] = None
 ) -> DetectionResult:
     """
     Main function to detect labels in an image.
@@ -230,31 +337,92 @@ def detect_labels(
         image_path: Path to image file (PNG, JPG, etc.)
         dxf_path: Path to DXF file (will be rendered to image first)
         model: "claude" or "gpt4v"
+        image_bytes: In-memory image, used instead of image_path (no temp file)
+        image_mime: MIME type of image_bytes (e.g. "image/jpeg")
+        race: Query both models concurrently and take the first result with
+            labels (lower latency, but both APIs are billed)
+        cache_dir: Directory for results keyed on the image content, model
+            and PROMPT_VERSION (falls back to $VISION_CACHE_DIR; unset disables caching)
     
     Returns:
         DetectionResult with labels and metadata
     """
-    # If DXF provided, render to image first
-    if dxf_path and not image_path:
-        from vision.image_renderer import render_dxf_to_image
-        image_path = render_dxf_to_image(dxf_path)
+    if image_bytes is None:
+        # If DXF provided, render to image first
+        if dxf_path and not image_path:
+            from vision.image_renderer import render_dxf_to_image
+            image_path = render_dxf_to_image(dxf_path)
+        
+        if not image_path:
+            raise ValueError("Either image_path, image_bytes or dxf_path must be provided")
+        
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+    
+    # Encode once; a fallback to the other model reuses the same payload
+    image_data, mime_type = _image_payload(image_path, image_bytes, image_mime)
     
-    if not image_path:
-        raise ValueError("Either image_path or dxf_path must be provided")
+    cache_dir = cache_dir or os.getenv("VISION_CACHE_DIR")
+    cache_file = None
+    if cache_dir:
+        digest = hashlib.sha256(f"{mime_type}:{image_data}".encode("ascii")).hexdigest()
+        mode = "race" if race else model
+        cache_file = os.path.join(cache_dir, f"{mode}_v{PROMPT_VERSION}_{digest}.json")
+        cached = _load_cached_result(cache_file)
+        if cached is not None:
+            return cached
     
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
+    result = _detect(image_data, mime_type, model, race)
+    
+    # Only successful parses are cached: an empty or unparseable response may
+    # be a transient model hiccup and must not stick to this image
+    if cache_file is not None and result.labels:
+        _store_cached_result(cache_file, result)
+    return result
+
+
+def _load_cached_result(cache_file: str) -> Optional[DetectionResult]:
+    """DetectionResult stored by _store_cached_result, or None if missing or unreadable"""
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        labels = [Label(**{**item, "bbox": tuple(item["bbox"])}) for item in data["labels"]]
+        return DetectionResult(labels=labels, model_used=data["model_used"], raw_response=data["raw_response"])
+    except (ValueError, KeyError, TypeError):
+        # Truncated or from an older Label layout: treat as a miss and re-detect
+        return None
+
+
+def _store_cached_result(cache_file: str, result: DetectionResult) -> None:
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    # Write-then-rename so a concurrent run never reads a partial file
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "labels": [asdict(label) for label in result.labels],
+            "model_used": result.model_used,
+            "raw_response": result.raw_response,
+        }, f)
+    os.replace(tmp_file, cache_file)
+
+
+def _detect(image_data: str, mime_type: str, model: str, race: bool) -> DetectionResult:
+    """Run the selected model, falling back to the other one on failure"""
+    if race:
+        return _race_detectors(image_data, mime_type)
     
     # Detect using selected model
     if model == "claude":
         try:
-            return detect_with_claude(image_path)
+            return detect_with_claude(image_data, mime_type)
         except Exception as e:
             print(f"Claude detection failed: {e}, falling back to GPT-4V")
-            return detect_with_gpt4v(image_path)
+            return detect_with_gpt4v(image_data, mime_type)
     else:
         try:
-            return detect_with_gpt4v(image_path)
+            return detect_with_gpt4v(image_data, mime_type)
         except Exception as e:
             print(f"GPT-4V detection failed: {e}, falling back to Claude")
-            return detect_with_claude(image_path)
+            return detect_with_claude(image_data, mime_type)
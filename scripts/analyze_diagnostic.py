@@ -2,25 +2,41 @@ import json
 import sys
 import os
 import io
+import codecs
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def analyze(json_path):
-    try:
-        with open(json_path, 'r', encoding='utf-8-sig') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        # Try utf-16le as fallback
-        with open(json_path, 'r', encoding='utf-16-le') as f:
-            data = json.load(f)
+def iter_matches(json_path):
+    """Yield the dump's match dicts, streamed with ijson when it is installed"""
+    with open(json_path, 'rb') as raw:
+        head = raw.read(4)
+        raw.seek(0)
+        if head.startswith(codecs.BOM_UTF16_LE) or b'\x00' in head:
+            # UTF-16 dumps (e.g. PowerShell redirects), re-encoded to UTF-8 on the fly
+            encoding = 'utf-16' if head.startswith(codecs.BOM_UTF16_LE) else 'utf-16-le'
+            stream = codecs.EncodedFile(raw, 'utf-8', encoding)
+        else:
+            if head.startswith(codecs.BOM_UTF8):
+                raw.seek(len(codecs.BOM_UTF8))
+            stream = raw
 
+        if HAS_IJSON:
+            yield from ijson.items(stream, 'matches.item', use_float=True)
+        else:
+            yield from json.load(stream).get('matches', [])
+
+def analyze(json_path):
     print("# Reporte de Discrepancias\n")
     print("| Row | Item | Unidad | Qty Calculada | Razón Match | Estado | Problema Detectado |")
     print("|-----|------|--------|---------------|-------------|--------|--------------------|")
 
-    matches = data.get('matches', [])
-    for m in matches:
+    for m in iter_matches(json_path):
         row = m.get('row_index')
         item = m.get('excel_item')
         unit = m.get('excel_unit')
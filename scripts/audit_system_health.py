@@ -3,18 +3,41 @@ import json
 import sys
 import os
 import io
+import codecs
+from collections import Counter
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # Force UTF-8 output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# match_reason substring -> failure category, checked in priority order
+FAILURE_CATEGORIES = (
+    ('Mismatch', 'Type Mismatch'),
+    ('Generic Block', 'Generic Block'),
+    ('insufficient_geometry', 'Insufficient Geometry'),
+    ('No candidate', 'No Match Found'),
+)
+
+def load_report(json_path):
+    # Read once; sniff UTF-16 (e.g. PowerShell redirects) from the raw bytes
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        text = raw.decode('utf-16')
+    elif b'\x00' in raw[:4]:
+        text = raw.decode('utf-16-le')
+    else:
+        text = raw.decode('utf-8-sig')
+    return orjson.loads(text) if HAS_ORJSON else json.loads(text)
+
 def audit(json_path):
     print(f"--- System Health Audit: {os.path.basename(json_path)} ---")
-    try:
-        with open(json_path, 'r', encoding='utf-8-sig') as f:
-            data = json.load(f)
-    except:
-        with open(json_path, 'r', encoding='utf-16-le') as f:
-            data = json.load(f)
+    data = load_report(json_path)
 
     matches = data.get('matches', [])
     total_items = len(matches)
@@ -23,30 +46,38 @@ def audit(json_path):
         print("No matches found in file.")
         return
 
-    # 1. Metric: Semantic Coverage (Did we find a candidate?)
-    items_with_candidates = [m for m in matches if m.get('source_items_count', 0) > 0 or m.get('matched_layer')]
-    semantic_coverage = len(items_with_candidates) / total_items * 100
-
-    # 2. Metric: Geometry Success (Did we extract a quantity?)
-    items_measured = [m for m in matches if (m.get('qty_final') or 0) > 0]
-    geometry_success = len(items_measured) / total_items * 100
-    
-    # 3. Metric: Confidence Reliability
-    # High confidence items that ended up with 0 qty (False Positives in matching?)
-    high_conf_failures = [m for m in matches if m.get('confidence') == 'high' and (m.get('qty_final') or 0) == 0]
-    
-    # 4. Failure Categorization
-    failure_reasons = {}
+    # Single pass over matches; all metrics are plain counters
+    with_candidates = 0
+    measured = 0
+    high_conf_failures = 0
+    failure_reasons = Counter()
     for m in matches:
-        if (m.get('qty_final') or 0) == 0:
+        qty = m.get('qty_final') or 0
+        matched_layer = m.get('matched_layer')
+        
+        # 1. Metric: Semantic Coverage (Did we find a candidate?)
+        if m.get('source_items_count', 0) > 0 or matched_layer:
+            with_candidates += 1
+        
+        # 2. Metric: Geometry Success (Did we extract a quantity?)
+        if qty > 0:
+            measured += 1
+        elif qty == 0:
+            # 3. Metric: Confidence Reliability
+            # High confidence items that ended up with 0 qty (False Positives in matching?)
+            if m.get('confidence') == 'high':
+                high_conf_failures += 1
+            
+            # 4. Failure Categorization
             reason = m.get('match_reason', 'Unknown')
-            if 'Mismatch' in reason: cat = 'Type Mismatch'
-            elif 'Generic Block' in reason: cat = 'Generic Block'
-            elif 'insufficient_geometry' in reason: cat = 'Insufficient Geometry'
-            elif 'No candidate' in reason or not m.get('matched_layer'): cat = 'No Match Found'
-            else: cat = 'Other Logic Failure'
+            cat = next((c for needle, c in FAILURE_CATEGORIES if needle in reason), None)
+            if cat is None:
+                cat = 'No Match Found' if not matched_layer else 'Other Logic Failure'
             
-            failure_reasons[cat] = failure_reasons.get(cat, 0) + 1
+            failure_reasons[cat] += 1
+
+    semantic_coverage = with_candidates / total_items * 100
+    geometry_success = measured / total_items * 100
 
     print(f"\n📊 GLOBAL METRICS")
     print(f"Total Items: {total_items}")
@@ -55,10 +86,10 @@ def audit(json_path):
     print(f"Critical Gap: {semantic_coverage - geometry_success:.1f}% (Found layer but failed to measure)")
     
     print(f"\n⚠️ RELIABILITY ALERTS")
-    print(f"High Confidence Failures: {len(high_conf_failures)} items (AI was sure, but Math failed)")
+    print(f"High Confidence Failures: {high_conf_failures} items (AI was sure, but Math failed)")
     
     # print(f"\n📉 FAILURE ROOT CAUSES (Items with Qty=0)")
-    # for cat, count in sorted(failure_reasons.items(), key=lambda x: x[1], reverse=True):
+    # for cat, count in failure_reasons.most_common():
     #     print(f"  - {cat}: {count} items")
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 
 import ezdxf
 import sys
-import pandas as pd
+from collections import Counter
 
 def inspect_layer(dxf_path, target_layer):
     try:
@@ -10,23 +10,24 @@ def inspect_layer(dxf_path, target_layer):
         
         print(f"--- Inspecting Layer: {target_layer} ---")
         
-        entities = msp.query(f'*[layer=="{target_layer}"]')
-        print(f"Total Entities: {len(entities)}")
-        
-        types = {}
+        # One pass over modelspace (no query-DSL parse + second walk)
+        types = Counter()
         closed_polys = 0
         open_polys = 0
         
-        for e in entities:
+        for e in msp:
+            if e.dxf.layer != target_layer:
+                continue
             etype = e.dxftype()
-            types[etype] = types.get(etype, 0) + 1
+            types[etype] += 1
             
-            if etype in ['LWPOLYLINE', 'POLYLINE']:
+            if etype in ('LWPOLYLINE', 'POLYLINE'):
                 if e.is_closed:
                     closed_polys += 1
                 else:
                     open_polys += 1
-                    
+        
+        print(f"Total Entities: {sum(types.values())}")
         print("Entity Types:")
         for t, c in types.items():
             print(f"  {t}: {c}")
@@ -1,21 +1,54 @@
 import sys
+import os
 import json
 import ezdxf
+from ezdxf.addons import iterdxf
 import math
-from ezdxf.math import Vec3
+import numpy as np
 from collections import defaultdict
-import uuid
-
-# Helper to calculate polygon area (Shoelace formula)
-def calculate_polygon_area(vertices):
-    n = len(vertices)
-    if n < 3: return 0.0
-    area = 0.0
-    for i in range(n):
-        j = (i + 1) % n
-        area += vertices[i].x * vertices[j].y
-        area -= vertices[j].x * vertices[i].y
-    return abs(area) / 2.0
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+def _xy_array(points):
+    # points: (x, y, ...) tuples or Vec2/Vec3 - anything indexable -> (n, 2) float array
+    n = len(points)
+    return np.fromiter((c for p in points for c in (p[0], p[1])), dtype=np.float64, count=2 * n).reshape(-1, 2)
+
+# Helper to calculate polygon area (Shoelace formula, vectorized)
+def calculate_polygon_area(points):
+    xy = points if isinstance(points, np.ndarray) else _xy_array(points)
+    if len(xy) < 3: return 0.0
+    x, y = xy[:, 0], xy[:, 1]
+    return float(0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+def calculate_polyline_length(xy, is_closed, bulges=None):
+    # Sum of segment lengths; bulges[i] (tan of 1/4 the arc angle) makes the
+    # segment starting at vertex i an arc: length = chord * (t/2) / sin(t/2)
+    if len(xy) < 2: return 0.0
+    seg = np.diff(xy, axis=0, append=xy[:1]) if is_closed else np.diff(xy, axis=0)
+    chords = np.hypot(seg[:, 0], seg[:, 1])
+    if bulges is not None and np.any(bulges):
+        half_angle = 2.0 * np.arctan(bulges[:len(chords)])
+        arc = half_angle != 0
+        chords[arc] *= half_angle[arc] / np.sin(half_angle[arc])
+    return float(chords.sum())
+
+def polyline_vertices(entity, etype):
+    # (n, 2) vertex coordinates and (n,) bulges of a LWPOLYLINE/POLYLINE
+    if etype == 'LWPOLYLINE':
+        xyb = np.array(entity.get_points('xyb'), dtype=np.float64).reshape(-1, 3)
+    else:
+        xyb = np.array([
+            (v.dxf.location.x, v.dxf.location.y, v.dxf.bulge) for v in entity.vertices
+        ], dtype=np.float64).reshape(-1, 3)
+    return xyb[:, :2], xyb[:, 2]
+
+# Files above this size are streamed with iterdxf instead of ezdxf.readfile
+STREAM_THRESHOLD_BYTES = 100 * 1024 * 1024
 
 # Conversion factors to Metros
 UNIT_FACTORS = {
@@ -40,160 +73,206 @@ def get_unit_factor(doc):
         pass
     return 1.0, 0
 
-def process_entity(entity, stats, items, unit_factor):
-    layer = entity.dxf.layer.lower()
+# --- AREAS (Hatch, Closed Polyline) ---
+def _handle_hatch(entity, etype, layer_raw, layer, stats, items, len_factor, area_factor):
+    area_raw = entity.area if hasattr(entity, 'area') else 0
+    area_si = area_raw * area_factor
     
-    # Pre-calculate scaling factors
-    len_factor = unit_factor
-    area_factor = unit_factor * unit_factor
+    if area_si > 0:
+        stats[layer]['area'] += area_si
+        stats[layer]['count'] += 1
+        
+        items.append({
+            "id": f"i{len(items)}", # Sequential per file; uuid4 cost a urandom call per item
+            "type": "area",
+            "layer_raw": layer_raw,
+            "layer_normalized": layer,
+            "value_si": area_si, 
+            "value_raw": area_raw,
+            "evidence": "HATCH",
+            "color": entity.dxf.color # Index 1-255
+        })
+
+def _handle_polyline(entity, etype, layer_raw, layer, stats, items, len_factor, area_factor):
+    is_closed = entity.is_closed
+    xy, bulges = polyline_vertices(entity, etype)
+    
+    # Calculate Length (perimeter for closed polylines; arc segments follow the bulge)
+    length_raw = calculate_polyline_length(xy, is_closed, bulges)
     
-    # --- AREAS (Hatch, Closed Polyline) ---
-    if entity.dxftype() == 'HATCH':
-        area_raw = entity.area if hasattr(entity, 'area') else 0
+    length_si = length_raw * len_factor
+    stats[layer]['length'] += length_si
+    
+    # Calculate Area if Closed (vertex polygon; bulges are not added)
+    if is_closed and len(xy) >= 3:
+        area_raw = calculate_polygon_area(xy)
         area_si = area_raw * area_factor
         
         if area_si > 0:
             stats[layer]['area'] += area_si
-            stats[layer]['count'] += 1
-            
             items.append({
-                "id": str(uuid.uuid4()),
+                "id": f"i{len(items)}",
                 "type": "area",
-                "layer_raw": entity.dxf.layer,
+                "layer_raw": layer_raw,
                 "layer_normalized": layer,
-                "value_si": area_si, 
+                "value_si": area_si,
                 "value_raw": area_raw,
-                "evidence": "HATCH",
-                "color": entity.dxf.color # Index 1-255
+                "evidence": "POLYLINE",
+                "color": entity.dxf.color
             })
 
-    elif entity.dxftype() in ('LWPOLYLINE', 'POLYLINE'):
-        is_closed = entity.is_closed
-        points = list(entity.vertices())
-        
-        # Calculate Length
-        length_raw = 0.0
-        # Try to use ezdxf helper or manual
-        if hasattr(entity, 'length'): 
-             length_raw = entity.length - 0 # Force float?
-        else:
-             # Basic implementation for polylines if entity.length missing in old ezdxf
-             # Skipping complex manual calc for brevity unless needed
-             pass
-        
-        length_si = length_raw * len_factor
-        stats[layer]['length'] += length_si
-        
-        # Calculate Area if Closed
-        if is_closed and len(points) >= 3:
-            # Normalize points
-            clean_points = []
-            for p in points:
-                if isinstance(p, (tuple, list)):
-                    clean_points.append(Vec3(p[0], p[1], 0))
-                else:
-                    clean_points.append(p)
-            
-            area_raw = calculate_polygon_area(clean_points)
-            area_si = area_raw * area_factor
-            
-            if area_si > 0:
-                stats[layer]['area'] += area_si
-                items.append({
-                    "id": str(uuid.uuid4()),
-                    "type": "area",
-                    "layer_raw": entity.dxf.layer,
-                    "layer_normalized": layer,
-                    "value_si": area_si,
-                    "value_raw": area_raw,
-                    "evidence": "POLYLINE",
-                    "color": entity.dxf.color
-                })
-
-    # --- LENGTHS (Line, Arc, Spline) ---
-    elif entity.dxftype() == 'LINE':
-        length_raw = entity.dxf.start.distance(entity.dxf.end)
-        length_si = length_raw * len_factor
-        
-        stats[layer]['length'] += length_si
-        stats[layer]['count'] += 1
-        
-        items.append({
-            "id": str(uuid.uuid4()),
-            "type": "length",
-            "layer_raw": entity.dxf.layer,
-            "layer_normalized": layer,
-            "value_si": length_si,
-            "value_raw": length_raw,
-            "evidence": "LINE",
-            "color": entity.dxf.color
-        })
+# --- LENGTHS (Line, Arc, Spline) ---
+def _handle_line(entity, etype, layer_raw, layer, stats, items, len_factor, area_factor):
+    length_raw = entity.dxf.start.distance(entity.dxf.end)
+    length_si = length_raw * len_factor
+    
+    stats[layer]['length'] += length_si
+    stats[layer]['count'] += 1
+    
+    items.append({
+        "id": f"i{len(items)}",
+        "type": "length",
+        "layer_raw": layer_raw,
+        "layer_normalized": layer,
+        "value_si": length_si,
+        "value_raw": length_raw,
+        "evidence": "LINE",
+        "color": entity.dxf.color
+    })
 
-    # --- BLOCKS (Insert) ---
-    elif entity.dxftype() == 'INSERT':
-        stats[layer]['blocks'] += 1
-        block_name = entity.dxf.name
-        
+# --- BLOCKS (Insert) ---
+def _handle_insert(entity, etype, layer_raw, layer, stats, items, len_factor, area_factor):
+    stats[layer]['blocks'] += 1
+    block_name = entity.dxf.name
+    
+    items.append({
+        "id": f"i{len(items)}",
+        "type": "block",
+        "name_raw": block_name,
+        "layer_raw": layer_raw,
+        "layer_normalized": layer,
+        "value_si": 1,
+        "value_raw": 1,
+        "evidence": "INSERT",
+        "color": entity.dxf.color
+    })
+
+# --- TEXT (Text, MText) ---
+def _handle_text(entity, etype, layer_raw, layer, stats, items, len_factor, area_factor):
+    text = entity.dxf.text if hasattr(entity.dxf, 'text') else ""
+    if text:
         items.append({
-            "id": str(uuid.uuid4()),
-            "type": "block",
-            "name_raw": block_name,
-            "layer_raw": entity.dxf.layer,
+            "id": f"i{len(items)}",
+            "type": "text",
+            "name_raw": text,
+            "layer_raw": layer_raw,
             "layer_normalized": layer,
-            "value_si": 1,
-            "value_raw": 1,
-            "evidence": "INSERT",
-            "color": entity.dxf.color
+            "value_si": 0,
+            "evidence": etype,
+            "position": { 
+                "x": entity.dxf.insert.x * len_factor, 
+                "y": entity.dxf.insert.y * len_factor 
+            }
         })
+
+# Entity type -> handler (one hash lookup instead of an if/elif chain)
+_HANDLERS = {
+    'HATCH': _handle_hatch,
+    'LWPOLYLINE': _handle_polyline,
+    'POLYLINE': _handle_polyline,
+    'LINE': _handle_line,
+    'INSERT': _handle_insert,
+    'TEXT': _handle_text,
+    'MTEXT': _handle_text,
+}
+
+def process_entity(entity, stats, items, unit_factor, area_factor, layer_cache):
+    etype = entity.dxftype()
+    handler = _HANDLERS.get(etype)
+    if handler is None:
+        return
+    
+    # Lowercased layer names, computed once per distinct layer
+    layer_raw = entity.dxf.layer
+    layer = layer_cache.get(layer_raw)
+    if layer is None:
+        layer = layer_cache[layer_raw] = layer_raw.lower()
+    
+    handler(entity, etype, layer_raw, layer, stats, items, unit_factor, area_factor)
+
+def read_header_insunits(file_path):
+    # $INSUNITS from the HEADER section of an ASCII DXF, without loading the document
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        in_insunits = False
+        while True:
+            code = f.readline()
+            value = f.readline()
+            if not value:
+                return None
+            code = code.strip()
+            value = value.strip()
+            if code == '9':
+                in_insunits = value == '$INSUNITS'
+            elif in_insunits and code == '70':
+                return int(value)
+            elif code == '0' and value == 'ENDSEC':
+                return None
+
+def build_result(file_path):
+    if os.path.getsize(file_path) > STREAM_THRESHOLD_BYTES:
+        # Huge file: stream modelspace entities instead of loading the whole document
+        dxf = iterdxf.opendxf(file_path)
+        try:
+            units = read_header_insunits(file_path)
+            if units is not None:
+                unit_factor, unit_code = UNIT_FACTORS.get(units, 1.0), units
+            else:
+                unit_factor, unit_code = 1.0, 0
+            return _build_result(dxf.modelspace(), unit_factor, unit_code, dxf.dxfversion)
+        finally:
+            dxf.close()
+    
+    doc = ezdxf.readfile(file_path)
+    
+    # Get Unit Scaling Factor
+    unit_factor, unit_code = get_unit_factor(doc)
+    return _build_result(doc.modelspace(), unit_factor, unit_code, doc.dxfversion)
+
+def _build_result(entities, unit_factor, unit_code, dxf_version):
+    # Log factor (via stderr to not pollute stdout JSON)
+    sys.stderr.write(f"Detected Units: {unit_code}, Factor to Meters: {unit_factor}\n")
+    
+    stats = defaultdict(lambda: {'area': 0.0, 'length': 0.0, 'count': 0, 'blocks': 0})
+    items = []
+    
+    # Hoisted per-DXF lookups
+    area_factor = unit_factor * unit_factor
+    layer_cache = {}
+
+    for entity in entities:
+        process_entity(entity, stats, items, unit_factor, area_factor, layer_cache)
         
-    # --- TEXT (Text, MText) ---
-    elif entity.dxftype() in ('TEXT', 'MTEXT'):
-        text = entity.dxf.text if hasattr(entity.dxf, 'text') else ""
-        if text:
-            items.append({
-                "id": str(uuid.uuid4()),
-                "type": "text",
-                "name_raw": text,
-                "layer_raw": entity.dxf.layer,
-                "layer_normalized": layer,
-                "value_si": 0,
-                "evidence": entity.dxftype(),
-                "position": { 
-                    "x": entity.dxf.insert.x * len_factor, 
-                    "y": entity.dxf.insert.y * len_factor 
-                }
-            })
+    return {
+        "status": "success",
+        "stats": stats,
+        "items": items,
+        "metadata": {
+            "dxf_version": dxf_version,
+            "units_code": unit_code,
+            "conversion_factor": unit_factor,
+            "total_entities": len(items)
+        }
+    }
 
 def process_dxf(file_path):
     try:
-        doc = ezdxf.readfile(file_path)
-        msp = doc.modelspace()
+        result = build_result(file_path)
         
-        # Get Unit Scaling Factor
-        unit_factor, unit_code = get_unit_factor(doc)
-        
-        # Log factor (via stderr to not pollute stdout JSON)
-        sys.stderr.write(f"Detected Units: {unit_code}, Factor to Meters: {unit_factor}\n")
-        
-        stats = defaultdict(lambda: {'area': 0.0, 'length': 0.0, 'count': 0, 'blocks': 0})
-        items = []
-
-        for entity in msp:
-            process_entity(entity, stats, items, unit_factor)
-            
-        result = {
-            "status": "success",
-            "stats": stats,
-            "items": items,
-            "metadata": {
-                "dxf_version": doc.dxfversion,
-                "units_code": unit_code,
-                "conversion_factor": unit_factor,
-                "total_entities": len(items)
-            }
-        }
-        
-        print(json.dumps(result))
+        if HAS_ORJSON:
+            sys.stdout.buffer.write(orjson.dumps(result))
+            sys.stdout.buffer.write(b"\n")
+        else:
+            print(json.dumps(result))
 
         
     except Exception as e:
@@ -0,0 +1,78 @@
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+import ezdxf
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import process_dxf
+
+
+class TestProcessDxf(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def build(self, doc):
+        path = os.path.join(self.tmp.name, "plan.dxf")
+        doc.saveas(path)
+        return process_dxf.build_result(path)
+
+    def test_polyline_lengths(self):
+        doc = ezdxf.new()
+        doc.header['$INSUNITS'] = 6  # Meters
+        msp = doc.modelspace()
+        # Square: 4 m perimeter, 1 m2
+        msp.add_lwpolyline([(0, 0), (1, 0), (1, 1), (0, 1)], close=True, dxfattribs={'layer': 'SQUARE'})
+        # Circle of radius 1 as two half-circle bulges: 2*pi perimeter
+        msp.add_lwpolyline([(-1, 0, 1), (1, 0, 1)], format='xyb', close=True, dxfattribs={'layer': 'CIRCLE'})
+        # Open POLYLINE: 3 m straight, then a half circle of radius 1 (pi)
+        msp.add_polyline2d([(0, 0, 0, 0, 0), (3, 0, 0, 0, 1), (5, 0)], format='xyseb', dxfattribs={'layer': 'OPEN'})
+
+        stats = self.build(doc)['stats']
+        self.assertAlmostEqual(stats['square']['length'], 4.0)
+        self.assertAlmostEqual(stats['square']['area'], 1.0)
+        self.assertAlmostEqual(stats['circle']['length'], 2 * math.pi)
+        self.assertAlmostEqual(stats['open']['length'], 3 + math.pi)
+
+    def test_streaming_matches_readfile(self):
+        doc = ezdxf.new()
+        doc.header['$INSUNITS'] = 4  # Millimeters
+        msp = doc.modelspace()
+        msp.add_line((0, 0), (3000, 4000), dxfattribs={'layer': 'Muros'})
+        msp.add_lwpolyline([(0, 0), (2000, 0), (2000, 1000), (0, 1000)], close=True, dxfattribs={'layer': 'Losa'})
+        msp.add_polyline2d([(0, 0), (1000, 0), (1000, 1000)], close=True, dxfattribs={'layer': 'Losa'})
+        hatch = msp.add_hatch(dxfattribs={'layer': 'Piso'})
+        hatch.paths.add_polyline_path([(0, 0), (1000, 0), (1000, 1000), (0, 1000)], is_closed=True)
+        doc.blocks.new('BLK').add_line((0, 0), (1, 1))
+        msp.add_blockref('BLK', (5, 5), dxfattribs={'layer': 'Equipos'})
+        msp.add_text('SALA', dxfattribs={'layer': 'Textos', 'insert': (100, 200)})
+
+        loaded = self.build(doc)
+        old_threshold = process_dxf.STREAM_THRESHOLD_BYTES
+        process_dxf.STREAM_THRESHOLD_BYTES = 0
+        self.addCleanup(setattr, process_dxf, 'STREAM_THRESHOLD_BYTES', old_threshold)
+        streamed = self.build(doc)
+
+        self.assertEqual(streamed['metadata']['units_code'], 4)
+        self.assertEqual(streamed['metadata']['conversion_factor'], 0.001)
+        self.assertEqual(streamed, loaded)
+        self.assertEqual({i['evidence'] for i in loaded['items']}, {'LINE', 'POLYLINE', 'INSERT', 'TEXT'})
+
+    def test_read_header_insunits(self):
+        doc = ezdxf.new()
+        path = os.path.join(self.tmp.name, "plan.dxf")
+        doc.header['$INSUNITS'] = 2  # Feet
+        doc.saveas(path)
+        self.assertEqual(process_dxf.read_header_insunits(path), 2)
+
+        del doc.header['$INSUNITS']
+        doc.saveas(path)
+        self.assertIsNone(process_dxf.read_header_insunits(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
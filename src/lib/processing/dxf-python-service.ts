@@ -22,8 +22,10 @@ export async function parseDxfWithPython(filePath: string): Promise<PythonDxfRes
         let dataString = '';
         let errorString = '';
 
-        pythonProcess.stdout.on('data', (data) => {
-            dataString += data.toString();
+        // Decode as a UTF-8 stream so multi-byte characters split across chunks survive
+        pythonProcess.stdout.setEncoding('utf8');
+        pythonProcess.stdout.on('data', (data: string) => {
+            dataString += data;
         });
 
         pythonProcess.stderr.on('data', (data) => {